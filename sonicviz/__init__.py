@@ -3,7 +3,17 @@
 __version__ = "0.1.0"
 __author__ = "Pedro Blaya Luz"
 
-from .visualization import WaveformVisualizer, ImageAnimatorVisualizer
+from .visualization import (
+    WaveformVisualizer, ImageAnimatorVisualizer, LayeredVisualizer,
+    render_to_bytes, render_to_stream
+)
 from .processing import BatchProcessor
 
-__all__ = ["WaveformVisualizer", "ImageAnimatorVisualizer", "BatchProcessor"]
+__all__ = [
+    "WaveformVisualizer",
+    "ImageAnimatorVisualizer",
+    "LayeredVisualizer",
+    "BatchProcessor",
+    "render_to_bytes",
+    "render_to_stream",
+]
@@ -1,7 +1,17 @@
 import sys
 import argparse
 from pathlib import Path
-from .processing import BatchProcessor
+from .processing import BatchProcessor, FolderWatcher, JobQueue, QueueWorker, RenderServer
+from .processing.scheduling import parse_memory_size
+from .visualization.formats import OUTPUT_FORMATS
+
+
+def positive_int(value: str) -> int:
+    """Parse a strictly positive integer argument."""
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be positive: {value}")
+    return number
 
 
 class VisualizerApp:
@@ -9,6 +19,12 @@ class VisualizerApp:
 
     def __init__(self) -> None:
         self.parser = self._create_parser()
+        self.commands = {
+            "enqueue": (self._create_enqueue_parser(), self._run_enqueue),
+            "worker": (self._create_worker_parser(), self._run_worker),
+            "serve": (self._create_serve_parser(), self._run_serve),
+            "watch": (self._create_watch_parser(), self._run_watch),
+        }
 
     def _create_parser(self) -> argparse.ArgumentParser:
         """Create and configure the argument parser."""
@@ -32,6 +48,20 @@ Examples:
   # Process folder with image animator
   python cli.py /path/to/audio/folder -t image
   python cli.py /path/to/audio/folder -t image -o /path/to/output/folder
+
+  # Transparent WebM, GIF or PNG sequence output (chosen by extension)
+  python cli.py audio.mp3 -t image -o output.webm
+  python cli.py /path/to/audio/folder -t image -f .gif
+
+  # Distribute a folder over several machines through a shared queue
+  python cli.py enqueue /path/to/audio/folder --queue /shared/jobs.db
+  python cli.py worker --queue /shared/jobs.db
+
+  # Keep a pool of warm workers and render over HTTP
+  python cli.py serve --port 8765 --workers 4
+
+  # Render new uploads to a folder as soon as they are complete
+  python cli.py watch /path/to/uploads -t image -j 4 --index uploads.json
             """
         )
         parser.add_argument("input", help="Input audio file or folder")
@@ -51,13 +81,337 @@ Examples:
             default=None,
             help="Maximum duration in seconds (useful for testing)"
         )
+        parser.add_argument(
+            "-f", "--format",
+            default=".mp4",
+            choices=list(OUTPUT_FORMATS),
+            help="Output format for batch mode (default: .mp4; .png writes PNG sequences)"
+        )
+        parser.add_argument(
+            "--pipelined",
+            action="store_true",
+            help="Encode while rendering instead of buffering every frame first"
+        )
+        parser.add_argument(
+            "--analysis-rate",
+            type=positive_int,
+            default=None,
+            help="Analyze audio at no less than this sample rate, e.g. 48000 for "
+                 "96/192 kHz masters (the output keeps the original audio)"
+        )
+        parser.add_argument(
+            "--index",
+            default=None,
+            help="File to persist the folder index in, for faster rescans (batch mode)"
+        )
+        parser.add_argument(
+            "-j", "--jobs",
+            type=int,
+            default=1,
+            help="Files rendered in parallel in batch mode, longest first (default: 1)"
+        )
+        parser.add_argument(
+            "--split-seconds",
+            type=float,
+            default=None,
+            help="With --jobs, split files longer than this into segments rendered in parallel"
+        )
+        parser.add_argument(
+            "--encoder-jobs",
+            type=int,
+            default=1,
+            help="Encode each buffered render as this many segments in parallel"
+        )
+        parser.add_argument(
+            "--segment-cache",
+            default=None,
+            help="Folder caching encoded segments; re-renders only redo changed segments"
+        )
+        parser.add_argument(
+            "--cache-size",
+            type=parse_memory_size,
+            default="2G",
+            help="Segment cache size before old segments are evicted (default: 2G)"
+        )
+        parser.add_argument(
+            "--memory-limit",
+            type=parse_memory_size,
+            default=None,
+            help="Memory budget such as 4G; picks buffered or streamed rendering per "
+                 "file and how many files run at once"
+        )
+        return parser
+
+    def _create_enqueue_parser(self) -> argparse.ArgumentParser:
+        """Create the parser for the ``enqueue`` command."""
+        parser = argparse.ArgumentParser(
+            prog="soundviz enqueue",
+            description="Write one render job per audio file into a shared queue"
+        )
+        parser.add_argument("input", help="Input audio folder")
+        parser.add_argument(
+            "-q", "--queue", required=True,
+            help="Path to the SQLite queue database (on shared storage)"
+        )
+        parser.add_argument(
+            "-o", "--output",
+            help="Output folder (defaults to input_folder_output)"
+        )
+        parser.add_argument(
+            "-t", "--type",
+            default="waveform",
+            choices=["waveform", "image"],
+            help="Visualizer type (default: waveform)"
+        )
+        parser.add_argument(
+            "-d", "--duration",
+            type=float,
+            default=None,
+            help="Maximum duration in seconds (useful for testing)"
+        )
+        parser.add_argument(
+            "-f", "--format",
+            default=".mp4",
+            choices=list(OUTPUT_FORMATS),
+            help="Output format for batch mode (default: .mp4; .png writes PNG sequences)"
+        )
+        parser.add_argument(
+            "--pipelined",
+            action="store_true",
+            help="Encode while rendering instead of buffering every frame first"
+        )
+        parser.add_argument(
+            "--analysis-rate",
+            type=positive_int,
+            default=None,
+            help="Analyze audio at no less than this sample rate, e.g. 48000 for "
+                 "96/192 kHz masters (the output keeps the original audio)"
+        )
+        parser.add_argument(
+            "--index",
+            default=None,
+            help="File to persist the folder index in, for faster rescans"
+        )
+        return parser
+
+    def _create_worker_parser(self) -> argparse.ArgumentParser:
+        """Create the parser for the ``worker`` command."""
+        parser = argparse.ArgumentParser(
+            prog="soundviz worker",
+            description="Claim and render jobs from a shared queue"
+        )
+        parser.add_argument(
+            "-q", "--queue", required=True,
+            help="Path to the SQLite queue database (on shared storage)"
+        )
+        parser.add_argument(
+            "--lease",
+            type=float,
+            default=300.0,
+            help="Lease length in seconds before a silent job is reclaimed (default: 300)"
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=3,
+            help="Attempts before a job is marked failed (default: 3)"
+        )
+        parser.add_argument(
+            "--exit-when-empty",
+            action="store_true",
+            help="Exit once the queue has no claimable jobs instead of polling"
+        )
+        return parser
+
+    def _create_serve_parser(self) -> argparse.ArgumentParser:
+        """Create the parser for the ``serve`` command."""
+        parser = argparse.ArgumentParser(
+            prog="soundviz serve",
+            description="Run a local render server with a pool of warm workers"
+        )
+        parser.add_argument(
+            "--host", default="127.0.0.1",
+            help="Interface to listen on (default: 127.0.0.1)"
+        )
+        parser.add_argument(
+            "--port", type=int, default=8765,
+            help="Port to listen on (default: 8765)"
+        )
+        parser.add_argument(
+            "--workers", type=int, default=None,
+            help="Number of worker processes (default: CPU count)"
+        )
+        return parser
+
+    def _create_watch_parser(self) -> argparse.ArgumentParser:
+        """Create the parser for the ``watch`` command."""
+        parser = argparse.ArgumentParser(
+            prog="soundviz watch",
+            description="Render audio files as they are added to a folder"
+        )
+        parser.add_argument("input", help="Input audio folder")
+        parser.add_argument(
+            "-o", "--output",
+            help="Output folder (defaults to input_folder_output)"
+        )
+        parser.add_argument(
+            "-t", "--type",
+            default="waveform",
+            choices=["waveform", "image"],
+            help="Visualizer type (default: waveform)"
+        )
+        parser.add_argument(
+            "-d", "--duration",
+            type=float,
+            default=None,
+            help="Maximum duration in seconds (useful for testing)"
+        )
+        parser.add_argument(
+            "-f", "--format",
+            default=".mp4",
+            choices=list(OUTPUT_FORMATS),
+            help="Output format (default: .mp4; .png writes PNG sequences)"
+        )
+        parser.add_argument(
+            "--pipelined",
+            action="store_true",
+            help="Encode while rendering instead of buffering every frame first"
+        )
+        parser.add_argument(
+            "--analysis-rate",
+            type=positive_int,
+            default=None,
+            help="Analyze audio at no less than this sample rate, e.g. 48000 for "
+                 "96/192 kHz masters (the output keeps the original audio)"
+        )
+        parser.add_argument(
+            "--index",
+            default=None,
+            help="File to persist the folder index in, so restarts skip unchanged folders"
+        )
+        parser.add_argument(
+            "-j", "--jobs",
+            type=int,
+            default=1,
+            help="Files rendered in parallel, shortest first (default: 1)"
+        )
+        parser.add_argument(
+            "--memory-limit",
+            type=parse_memory_size,
+            default=None,
+            help="Memory budget such as 4G for the files rendered at once"
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds between polls (default: 2)"
+        )
+        parser.add_argument(
+            "--settle-polls",
+            type=int,
+            default=1,
+            help="Polls a file must stay unchanged before it is rendered (default: 1)"
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once every complete file is rendered instead of watching"
+        )
         return parser
 
+    def _run_enqueue(self, parsed_args: argparse.Namespace) -> None:
+        """Enqueue every audio file of a folder."""
+        input_path = Path(parsed_args.input)
+        if not input_path.is_dir():
+            print(f"Error: {input_path} is not a valid directory")
+            sys.exit(1)
+        processor = BatchProcessor(
+            visualizer_type=parsed_args.type,
+            max_duration=parsed_args.duration,
+            index_file=parsed_args.index,
+            pipelined=parsed_args.pipelined,
+            output_format=parsed_args.format,
+            analysis_rate=parsed_args.analysis_rate
+        )
+        queue = JobQueue(parsed_args.queue)
+        try:
+            count = processor.enqueue_folder(input_path, queue, parsed_args.output)
+        except FileNotFoundError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+        print(f"Enqueued {count} job(s) into {parsed_args.queue}")
+
+    def _run_worker(self, parsed_args: argparse.Namespace) -> None:
+        """Run a queue worker."""
+        queue = JobQueue(
+            parsed_args.queue,
+            lease_seconds=parsed_args.lease,
+            max_attempts=parsed_args.max_attempts
+        )
+        worker = QueueWorker(queue)
+        worker.run(exit_when_empty=parsed_args.exit_when_empty)
+
+    def _run_serve(self, parsed_args: argparse.Namespace) -> None:
+        """Run the render server until interrupted."""
+        server = RenderServer(parsed_args.host, parsed_args.port, parsed_args.workers)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+
+    def _run_watch(self, parsed_args: argparse.Namespace) -> None:
+        """Watch a folder until interrupted."""
+        input_path = Path(parsed_args.input)
+        if not input_path.is_dir():
+            print(f"Error: {input_path} is not a valid directory")
+            sys.exit(1)
+        processor = BatchProcessor(
+            visualizer_type=parsed_args.type,
+            max_duration=parsed_args.duration,
+            index_file=parsed_args.index,
+            pipelined=parsed_args.pipelined,
+            output_format=parsed_args.format,
+            analysis_rate=parsed_args.analysis_rate,
+            jobs=parsed_args.jobs,
+            memory_limit=parsed_args.memory_limit
+        )
+        watcher = FolderWatcher(
+            processor, input_path, parsed_args.output,
+            interval=parsed_args.interval, settle_polls=parsed_args.settle_polls
+        )
+        try:
+            watcher.run(once=parsed_args.once)
+        except KeyboardInterrupt:
+            pass
+
     def run(self, args: list = None) -> None:
         """Main entry point for the application."""
+        if args is None:
+            args = sys.argv[1:]
+        if args and args[0] in self.commands:
+            parser, handler = self.commands[args[0]]
+            handler(parser.parse_args(args[1:]))
+            return
+
         parsed_args = self.parser.parse_args(args)
         input_path = Path(parsed_args.input)
-        processor = BatchProcessor(visualizer_type=parsed_args.type, max_duration=parsed_args.duration)
+        processor = BatchProcessor(
+            visualizer_type=parsed_args.type,
+            max_duration=parsed_args.duration,
+            index_file=parsed_args.index,
+            pipelined=parsed_args.pipelined,
+            output_format=parsed_args.format,
+            analysis_rate=parsed_args.analysis_rate,
+            jobs=parsed_args.jobs,
+            split_seconds=parsed_args.split_seconds,
+            memory_limit=parsed_args.memory_limit,
+            encoder_jobs=parsed_args.encoder_jobs,
+            segment_cache=parsed_args.segment_cache,
+            cache_size=parsed_args.cache_size
+        )
 
         if input_path.is_file():
             processor.process_single_file(input_path, parsed_args.output)
@@ -1,5 +1,11 @@
 """Batch processing module."""
 
 from .batch import BatchProcessor
+from .job_queue import JobQueue, QueueWorker
+from .server import RenderClient, RenderServer
+from .watch import FolderWatcher
 
-__all__ = ["BatchProcessor"]
+__all__ = [
+    "BatchProcessor", "FolderWatcher", "JobQueue", "QueueWorker", "RenderClient",
+    "RenderServer",
+]
@@ -1,8 +1,17 @@
 """Batch processing of audio files for visualization."""
 
 import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
 from ..visualization import WaveformVisualizer, ImageAnimatorVisualizer
+from ..visualization.encoder import PIXEL_FORMAT_BYTES, concat_segments
+from ..visualization.formats import lookup_output_format
+from ..visualization.segment_cache import SegmentCache
+from .index import AudioIndex
+from .scheduling import (
+    QUEUE_SIZES, Admission, ExecutionPlan, MemoryPlanner, longest_first, probe_job,
+    split_job
+)
 
 
 class BatchProcessor:
@@ -14,12 +23,46 @@ class BatchProcessor:
         "image": ImageAnimatorVisualizer,
     }
 
-    def __init__(self, visualizer_type: str = "waveform", max_duration: float = None) -> None:
+    def __init__(
+        self,
+        visualizer_type: str = "waveform",
+        max_duration: float = None,
+        index_file: str = None,
+        pipelined: bool = False,
+        output_format: str = ".mp4",
+        jobs: int = 1,
+        split_seconds: float = None,
+        memory_limit: int = None,
+        encoder_jobs: int = 1,
+        segment_cache: str = None,
+        cache_size: int = 2 * 1024 ** 3,
+        analysis_rate: int = None
+    ) -> None:
         """Initialize the batch processor.
 
         Args:
             visualizer_type: Type of visualizer to use ("waveform" or "image")
             max_duration: Maximum duration in seconds to process (None for full duration)
+            index_file: Path where the folder index is persisted between runs
+                        (None to rescan every time)
+            pipelined: Encode while rendering instead of buffering all frames
+            output_format: Extension of the output files (".mp4", ".webm",
+                           ".gif", ".apng" or ".png" for PNG sequences)
+            jobs: Number of files rendered in parallel in folder mode
+            split_seconds: With several jobs, render files longer than this as
+                           segments in parallel and join them (None to never split)
+            memory_limit: Memory budget in bytes; each job is then buffered or
+                          streamed to fit it and concurrent jobs are admitted
+                          only while their estimates fit (None for no limit)
+            encoder_jobs: Parallel ffmpeg processes encoding segments of each
+                          buffered render
+            segment_cache: Folder caching encoded segments, so re-renders
+                           after an edit only render the changed segments
+                           (None to render everything)
+            cache_size: Size in bytes above which the segment cache evicts
+                        its least recently used segments
+            analysis_rate: Analyze audio at no less than this sample rate,
+                           decimating higher-rate sources (None for native)
         """
         if visualizer_type not in self.VISUALIZER_TYPES:
             raise ValueError(
@@ -29,6 +72,97 @@ class BatchProcessor:
         self.visualizer_type = visualizer_type
         self.visualizer_class = self.VISUALIZER_TYPES[visualizer_type]
         self.max_duration = max_duration
+        self.index_file = index_file
+        self.pipelined = pipelined
+        lookup_output_format(output_format)
+        self.output_format = output_format
+        self.jobs = jobs
+        self.split_seconds = split_seconds
+        self.memory_limit = memory_limit
+        self.encoder_jobs = encoder_jobs
+        self.segment_cache = segment_cache
+        self.cache_size = cache_size
+        self.analysis_rate = analysis_rate
+
+    def create_visualizer(
+        self, audio_file: Path, output_file: Path, image_file: Path = None
+    ):
+        """Build the configured visualizer for one audio file.
+
+        Args:
+            audio_file: Path to the audio file
+            output_file: Output video file path
+            image_file: Image paired with the audio file (image visualizer only;
+                        looked up next to the audio file when None)
+
+        Returns:
+            A visualizer instance ready to run
+        """
+        if self.visualizer_class == ImageAnimatorVisualizer:
+            return self.visualizer_class(
+                str(audio_file), str(image_file) if image_file else None,
+                str(output_file), max_duration=self.max_duration,
+                analysis_rate=self.analysis_rate
+            )
+        return self.visualizer_class(
+            str(audio_file), str(output_file),
+            max_duration=self.max_duration, analysis_rate=self.analysis_rate
+        )
+
+    def render_file(
+        self,
+        audio_file: Path,
+        output_file: Path,
+        image_file: Path = None,
+        frame_range: tuple = None,
+        pipelined: bool = None,
+        queue_size: int = QUEUE_SIZES[0]
+    ) -> None:
+        """Render one audio file, raising on failure.
+
+        Args:
+            audio_file: Path to the audio file
+            output_file: Output video file path
+            image_file: Image paired with the audio file (image visualizer only)
+            frame_range: (start, stop) frames to render as a silent segment
+                         (None for the whole file with audio)
+            pipelined: Override the processor's pipelined setting
+            queue_size: Encoder queue size when pipelined
+        """
+        if pipelined is None:
+            pipelined = self.pipelined
+        visualizer = self.create_visualizer(audio_file, output_file, image_file)
+        visualizer.frame_range = frame_range
+        cache = None
+        if self.segment_cache is not None:
+            cache = SegmentCache(self.segment_cache, self.cache_size)
+        visualizer.run(
+            pipelined=pipelined, queue_size=queue_size,
+            encoder_jobs=self.encoder_jobs, cache=cache
+        )
+
+    def plan_execution(self, job) -> ExecutionPlan:
+        """Choose buffered or streamed rendering for a probed job.
+
+        Without a memory limit this is the processor's own setting.
+        """
+        if self.memory_limit is None:
+            return ExecutionPlan(self.pipelined, QUEUE_SIZES[0], 0)
+        pixel_format = self.visualizer_class.PIXEL_FORMAT
+        if pixel_format is None:
+            alpha = lookup_output_format(self.output_format).alpha
+            pixel_format = "rgba" if alpha else "rgb24"
+        planner = MemoryPlanner(
+            self.memory_limit, self.jobs, self.pipelined,
+            bytes_per_pixel=PIXEL_FORMAT_BYTES[pixel_format]
+        )
+        plan = planner.plan(job)
+        if plan.over_budget:
+            print(
+                f"⚠ {job.audio_file.name} needs about {plan.memory / 1024 ** 2:.0f} MiB, "
+                f"over the memory limit; streaming it on its own"
+            )
+        return plan
 
     def process_single_file(
         self, audio_file: Path, output_file: str = None
@@ -37,27 +171,30 @@ class BatchProcessor:
 
         Args:
             audio_file: Path to the audio file
-            output_file: Output video file path (defaults to audio_name_output.mp4)
+            output_file: Output video file path (defaults to audio_name_output
+                         with the configured output format's extension)
         """
         if output_file is None:
-            output_file = f"{audio_file.stem}_output.mp4"
+            output_file = f"{audio_file.stem}_output{self.output_format}"
 
         print(f"Processing single file: {audio_file}")
         print(f"Visualizer type: {self.visualizer_type}")
         if self.max_duration:
             print(f"Max duration: {self.max_duration}s")
         try:
-            if self.visualizer_class == ImageAnimatorVisualizer:
-                visualizer = self.visualizer_class(
-                    str(audio_file), None, str(output_file),
-                    max_duration=self.max_duration
-                )
+            if self.memory_limit is None:
+                self.render_file(audio_file, output_file)
             else:
-                visualizer = self.visualizer_class(
-                    str(audio_file), str(output_file),
-                    max_duration=self.max_duration
+                image_file = None
+                if self.visualizer_class == ImageAnimatorVisualizer:
+                    image_file = audio_file.with_suffix(".png")
+                plan = self.plan_execution(
+                    probe_job(audio_file, image_file, output_file, self.max_duration)
+                )
+                self.render_file(
+                    audio_file, output_file,
+                    pipelined=plan.pipelined, queue_size=plan.queue_size
                 )
-            visualizer.run()
             print(f"✓ Successfully saved to: {output_file}")
         except Exception as e:
             print(f"✗ Error processing {audio_file.name}: {e}")
@@ -87,45 +224,236 @@ class BatchProcessor:
             print(f"Max duration: {self.max_duration}s")
         print(f"Output folder: {output_folder}\n")
 
-        # Find all audio files
-        audio_files = [
-            f for f in input_folder.rglob("*")
-            if f.suffix.lower() in self.AUDIO_EXTENSIONS
-        ]
+        try:
+            jobs = self.find_jobs(input_folder)
+        except FileNotFoundError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
 
-        if not audio_files:
+        if not jobs:
             print(f"No audio files found in {input_folder}")
             sys.exit(1)
 
-        print(f"Found {len(audio_files)} audio file(s)\n")
+        print(f"Found {len(jobs)} audio file(s)\n")
+
+        # Probe every file and dispatch the longest first
+        render_jobs, failed = self.plan_jobs(jobs, output_folder)
+        if self.jobs > 1:
+            successful, parallel_failed = self._process_parallel(render_jobs)
+            failed += parallel_failed
+        else:
+            successful = 0
+            for idx, job in enumerate(render_jobs, 1):
+                try:
+                    print(f"[{idx}/{len(render_jobs)}] Processing: {job.audio_file.name}")
+                    plan = self.plan_execution(job)
+                    self.render_file(
+                        job.audio_file, job.output_file, job.image_file,
+                        pipelined=plan.pipelined, queue_size=plan.queue_size
+                    )
+                    print(f"✓ Completed: {job.output_file}\n")
+                    successful += 1
+                except Exception as e:
+                    print(f"✗ Error processing {job.audio_file.name}: {e}\n")
+                    failed += 1
+
+        # Print summary
+        self._print_summary(successful, len(jobs), failed, output_folder)
+
+    def plan_jobs(self, jobs: list, output_folder: Path) -> tuple:
+        """Probe (audio_file, image_file) pairs and order them longest first.
+
+        Args:
+            jobs: Pairs returned by find_jobs
+            output_folder: Folder the outputs are written to
+
+        Returns:
+            Tuple of (RenderJob list in dispatch order, number of files that
+            could not be probed)
+        """
+        render_jobs = []
+        failed = 0
+        for audio_file, image_file in jobs:
+            output_file = output_folder / f"{audio_file.stem}{self.output_format}"
+            try:
+                render_jobs.append(
+                    probe_job(audio_file, image_file, output_file, self.max_duration)
+                )
+            except Exception as e:
+                print(f"✗ Error reading {audio_file.name}: {e}\n")
+                failed += 1
+        return longest_first(render_jobs), failed
+
+    def _segment_jobs(self, job) -> list:
+        """Split a long job into segments if splitting applies to it."""
+        output_format = lookup_output_format(self.output_format)
+        if (
+            self.split_seconds is None
+            or output_format.sequence
+            or output_format.palette
+        ):
+            return [job]
+        hop_length = self.visualizer_class.HOP_LENGTH
+        segment_frames = max(1, int(self.split_seconds * job.sample_rate / hop_length))
+        return split_job(job, segment_frames)
+
+    def _process_parallel(self, render_jobs: list) -> tuple:
+        """Render jobs (and segments of long jobs) on a process pool.
+
+        Tasks are dispatched longest first. With a memory limit a task is
+        only started while the estimates of the running tasks plus its own
+        fit the limit, and exclusive tasks wait until nothing else runs.
+        Segments of a split job are joined once all of them are done.
 
-        # Process each audio file
+        Returns:
+            Tuple of (successful, failed) file counts
+        """
+        segments = {idx: self._segment_jobs(job) for idx, job in enumerate(render_jobs)}
+        pending = sorted(
+            [
+                (segment, idx, self.plan_execution(segment))
+                for idx, parts in segments.items() for segment in parts
+            ],
+            key=lambda task: task[0].cost, reverse=True
+        )
+        remaining = {idx: len(parts) for idx, parts in segments.items()}
+        errors = {}
+        running = {}
+        admission = self.admission()
         successful = 0
         failed = 0
 
-        for idx, audio_file in enumerate(audio_files, 1):
-            try:
-                print(f"[{idx}/{len(audio_files)}] Processing: {audio_file.name}")
-                output_file = output_folder / f"{audio_file.stem}.mp4"
-                if self.visualizer_class == ImageAnimatorVisualizer:
-                    visualizer = self.visualizer_class(
-                        str(audio_file), None, str(output_file),
-                        max_duration=self.max_duration
+        print(f"Rendering {len(render_jobs)} file(s) as {len(pending)} task(s) on {self.jobs} worker(s)\n")
+        with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+            while pending or running:
+                while pending and admission.admits(pending[0][2]):
+                    segment, idx, plan = pending.pop(0)
+                    future = pool.submit(
+                        self.render_file, segment.audio_file, segment.output_file,
+                        segment.image_file, segment.frame_range,
+                        plan.pipelined, plan.queue_size
                     )
-                else:
-                    visualizer = self.visualizer_class(
-                        str(audio_file), str(output_file),
-                        max_duration=self.max_duration
+                    running[future] = (idx, plan)
+                    admission.start(plan)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx, plan = running.pop(future)
+                    admission.finish(plan)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        errors.setdefault(idx, e)
+                    remaining[idx] -= 1
+                    if remaining[idx] > 0:
+                        continue
+                    if self._finish_job(render_jobs[idx], segments[idx], errors.get(idx)):
+                        successful += 1
+                    else:
+                        failed += 1
+        return successful, failed
+
+    def admission(self) -> Admission:
+        """Admission control for rendering on ``jobs`` workers within the memory limit."""
+        return Admission(self.jobs, self.memory_limit)
+
+    def _finish_job(self, job, segments: list, error: Exception = None) -> bool:
+        """Join a job's segments once all are rendered and report the result.
+
+        Returns:
+            True if the job's output was written
+        """
+        if len(segments) > 1:
+            if error is None:
+                try:
+                    concat_segments(
+                        [segment.output_file for segment in segments],
+                        job.output_file, job.audio_file, self.max_duration
                     )
-                visualizer.run()
-                print(f"✓ Completed: {output_file}\n")
-                successful += 1
-            except Exception as e:
-                print(f"✗ Error processing {audio_file.name}: {e}\n")
-                failed += 1
+                except Exception as e:
+                    error = e
+            for segment in segments:
+                segment.output_file.unlink(missing_ok=True)
 
-        # Print summary
-        self._print_summary(successful, len(audio_files), failed, output_folder)
+        if error is not None:
+            print(f"✗ Error processing {job.audio_file.name}: {error}\n")
+            return False
+        print(f"✓ Completed: {job.output_file}\n")
+        return True
+
+    def build_index(self, input_folder: Path) -> AudioIndex:
+        """Scan a folder, reusing and updating the persisted index if any.
+
+        Args:
+            input_folder: Path to folder containing audio files
+
+        Returns:
+            Index of the folder's audio files and images
+        """
+        previous = None
+        if self.index_file is not None:
+            previous = AudioIndex.load(self.index_file)
+        index = AudioIndex.scan(input_folder, self.AUDIO_EXTENSIONS, previous)
+        if self.index_file is not None:
+            index.save(self.index_file)
+        return index
+
+    def find_jobs(self, input_folder: Path) -> list:
+        """Find all audio files below a folder and pair them with images.
+
+        For the image visualizer every pair is validated before returning, so
+        a missing image fails the batch before any rendering starts.
+
+        Args:
+            input_folder: Path to folder containing audio files
+
+        Returns:
+            List of (audio_file, image_file) tuples; image_file is None for
+            the waveform visualizer
+
+        Raises:
+            FileNotFoundError: If an image visualizer job has no paired image
+        """
+        index = self.build_index(input_folder)
+        if self.visualizer_class == ImageAnimatorVisualizer:
+            return index.validate_pairs()
+        return [(audio_file, None) for audio_file in index.audio_files()]
+
+    def enqueue_folder(
+        self, input_folder: Path, queue, output_folder: str = None
+    ) -> int:
+        """Write one queue job per audio file in a folder.
+
+        Args:
+            input_folder: Path to folder containing audio files
+            queue: JobQueue that receives the jobs
+            output_folder: Output folder path (defaults to input_folder_output)
+
+        Returns:
+            Number of jobs enqueued
+        """
+        if output_folder is None:
+            output_folder = Path(
+                input_folder.parent
+            ) / f"{input_folder.name}_output"
+        else:
+            output_folder = Path(output_folder)
+
+        jobs = self.find_jobs(input_folder)
+        for audio_file, image_file in jobs:
+            output_file = output_folder / f"{audio_file.stem}{self.output_format}"
+            params = {
+                "max_duration": self.max_duration,
+                "pipelined": self.pipelined,
+                "analysis_rate": self.analysis_rate,
+            }
+            if image_file is not None:
+                params["image_file"] = str(image_file.resolve())
+            queue.enqueue(
+                audio_file.resolve(), output_file.resolve(),
+                self.visualizer_type, params
+            )
+        return len(jobs)
 
     @staticmethod
     def _print_summary(
@@ -0,0 +1,187 @@
+"""Single-pass discovery of audio files and their paired images."""
+
+import json
+import os
+from pathlib import Path
+
+
+class AudioIndex:
+    """Index of the audio files below a folder and the images paired with them.
+
+    The tree is walked once with ``os.scandir``. Only file names are kept,
+    and file types come from the directory listing, so a scan costs one
+    ``stat`` per directory and none per file; :meth:`stat` reads a file's
+    size and modification time on demand. An index saved with :meth:`save`
+    can be passed back to :meth:`scan`; directories whose modification time
+    has not changed are then reused without being listed again.
+
+    A directory's modification time only changes when entries are added,
+    removed or renamed, not when a file is rewritten in place.
+    """
+
+    IMAGE_EXTENSION = ".png"
+    VERSION = 2
+
+    def __init__(
+        self, root: Path, audio_extensions: set, directories: dict = None
+    ) -> None:
+        """Initialize an index.
+
+        Args:
+            root: Folder the index covers
+            audio_extensions: Lower-case audio suffixes the index holds
+            directories: Mapping of relative directory path to its entry, as
+                         produced by :meth:`scan`
+        """
+        self.root = Path(root)
+        self.audio_extensions = {ext.lower() for ext in audio_extensions}
+        self.directories = directories or {}
+
+    @classmethod
+    def scan(
+        cls, root: Path, audio_extensions: set, previous: "AudioIndex" = None
+    ) -> "AudioIndex":
+        """Walk a folder tree and index audio and image files.
+
+        Args:
+            root: Folder to scan
+            audio_extensions: Lower-case audio suffixes to index
+            previous: Earlier index of the same folder to reuse unchanged
+                      directories from
+
+        Returns:
+            The new index
+        """
+        root = Path(root)
+        reusable = {}
+        audio_extensions = {ext.lower() for ext in audio_extensions}
+        if (
+            previous is not None
+            and previous.root == root
+            and previous.audio_extensions == audio_extensions
+        ):
+            reusable = previous.directories
+        wanted = audio_extensions | {cls.IMAGE_EXTENSION}
+        directories = {}
+        pending = ["."]
+
+        while pending:
+            rel_dir = pending.pop()
+            path = root / rel_dir
+            mtime_ns = os.stat(path).st_mtime_ns
+            cached = reusable.get(rel_dir)
+            if cached is not None and cached["mtime_ns"] == mtime_ns:
+                directories[rel_dir] = cached
+                pending.extend(cls._child(rel_dir, d) for d in cached["subdirs"])
+                continue
+
+            files = []
+            subdirs = []
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif os.path.splitext(entry.name)[1].lower() in wanted:
+                        files.append(entry.name)
+            directories[rel_dir] = {
+                "mtime_ns": mtime_ns, "files": sorted(files), "subdirs": sorted(subdirs)
+            }
+            pending.extend(cls._child(rel_dir, d) for d in subdirs)
+
+        return cls(root, audio_extensions, directories)
+
+    @staticmethod
+    def _child(rel_dir: str, name: str) -> str:
+        """Return the index key of a subdirectory."""
+        return os.path.normpath(os.path.join(rel_dir, name))
+
+    def audio_files(self) -> list:
+        """Return all indexed audio files, sorted by path."""
+        found = []
+        for rel_dir, entry in self.directories.items():
+            for name in entry["files"]:
+                if os.path.splitext(name)[1].lower() in self.audio_extensions:
+                    found.append(Path(os.path.normpath(self.root / rel_dir / name)))
+        return sorted(found)
+
+    def pairs(self) -> list:
+        """Pair every audio file with the PNG of the same name.
+
+        Returns:
+            List of (audio_path, image_path) tuples; image_path is None when
+            the audio file has no image
+        """
+        pairs = []
+        listings = {}
+        for audio_file in self.audio_files():
+            rel_dir = os.path.relpath(audio_file.parent, self.root)
+            if rel_dir not in listings:
+                listings[rel_dir] = set(self.directories[rel_dir]["files"])
+            image_name = audio_file.stem + self.IMAGE_EXTENSION
+            image_file = None
+            if image_name in listings[rel_dir]:
+                image_file = audio_file.with_name(image_name)
+            pairs.append((audio_file, image_file))
+        return pairs
+
+    def validate_pairs(self) -> list:
+        """Pair audio files with images, failing if any image is missing.
+
+        Returns:
+            The pairs from :meth:`pairs`
+
+        Raises:
+            FileNotFoundError: Listing every audio file without an image
+        """
+        pairs = self.pairs()
+        missing = [audio for audio, image in pairs if image is None]
+        if missing:
+            listing = "\n".join(f"  {audio.with_suffix(self.IMAGE_EXTENSION)}" for audio in missing)
+            raise FileNotFoundError(
+                f"Image file not found for {len(missing)} audio file(s):\n{listing}"
+            )
+        return pairs
+
+    def stat(self, path: Path) -> tuple:
+        """Return the current (size, mtime_ns) of an indexed file, or None.
+
+        The file is stat-ed on every call. None is returned for files that
+        are not in the index or no longer exist.
+        """
+        path = Path(path)
+        rel_dir = os.path.relpath(path.parent, self.root)
+        entry = self.directories.get(rel_dir)
+        if entry is None or path.name not in entry["files"]:
+            return None
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def save(self, index_file: Path) -> None:
+        """Write the index as JSON so a later scan can reuse it."""
+        data = {
+            "version": self.VERSION,
+            "root": str(self.root),
+            "audio_extensions": sorted(self.audio_extensions),
+            "directories": self.directories,
+        }
+        tmp_file = Path(f"{index_file}.tmp")
+        tmp_file.write_text(json.dumps(data))
+        os.replace(tmp_file, index_file)
+
+    @classmethod
+    def load(cls, index_file: Path) -> "AudioIndex":
+        """Read an index written by :meth:`save`.
+
+        Returns:
+            The stored index, or None if the file is missing or unreadable
+        """
+        try:
+            data = json.loads(Path(index_file).read_text())
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != cls.VERSION:
+            return None
+        return cls(Path(data["root"]), data["audio_extensions"], data["directories"])
@@ -0,0 +1,349 @@
+"""SQLite-backed work queue for rendering across several machines."""
+
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from ..visualization.formats import lookup_output_format
+from .batch import BatchProcessor
+
+
+@dataclass
+class Job:
+    """A render job claimed from the queue."""
+
+    id: int
+    audio_file: str
+    output_file: str
+    visualizer_type: str
+    params: dict
+    attempts: int
+
+
+class JobQueue:
+    """Work queue stored in a SQLite database on shared storage.
+
+    Workers claim jobs atomically and hold them under a lease. A worker that
+    stops sending heartbeats loses its lease, and the job becomes claimable
+    again until it has been attempted ``max_attempts`` times.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            audio_file TEXT NOT NULL,
+            output_file TEXT NOT NULL,
+            visualizer_type TEXT NOT NULL,
+            params TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker TEXT,
+            lease_expires REAL,
+            error TEXT,
+            created REAL NOT NULL,
+            updated REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_expires);
+    """
+
+    def __init__(
+        self, db_path: str, lease_seconds: float = 300.0, max_attempts: int = 3
+    ) -> None:
+        """Open (and create if needed) a job queue.
+
+        Args:
+            db_path: Path to the SQLite database file
+            lease_seconds: How long a claim stays valid without a heartbeat
+            max_attempts: Number of claims before a job is marked failed
+        """
+        self.db_path = str(db_path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        with closing(self._connect()) as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection that manages transactions explicitly."""
+        conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def enqueue(
+        self,
+        audio_file: Path,
+        output_file: Path,
+        visualizer_type: str = "waveform",
+        params: dict = None
+    ) -> int:
+        """Add a job to the queue.
+
+        Args:
+            audio_file: Path to the audio file
+            output_file: Output video file path
+            visualizer_type: Type of visualizer to use
+            params: Extra visualizer parameters (e.g. max_duration)
+
+        Returns:
+            The id of the new job
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (audio_file, output_file, visualizer_type, "
+                "params, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (str(audio_file), str(output_file), visualizer_type,
+                 json.dumps(params or {}), now, now)
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker_id: str) -> Job:
+        """Atomically claim the oldest available job.
+
+        Pending jobs and running jobs whose lease has expired are both
+        available. Expired jobs that have used all their attempts are marked
+        failed instead.
+
+        Args:
+            worker_id: Identifier of the claiming worker
+
+        Returns:
+            The claimed job, or None if nothing is available
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'lease expired', "
+                "updated = ? WHERE status = 'running' AND lease_expires < ? "
+                "AND attempts >= ?",
+                (now, now, self.max_attempts)
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'pending' OR "
+                "(status = 'running' AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, "
+                "attempts = attempts + 1, lease_expires = ?, updated = ? "
+                "WHERE id = ?",
+                (worker_id, now + self.lease_seconds, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        return Job(
+            id=row["id"],
+            audio_file=row["audio_file"],
+            output_file=row["output_file"],
+            visualizer_type=row["visualizer_type"],
+            params=json.loads(row["params"]),
+            attempts=row["attempts"] + 1,
+        )
+
+    def _update_owned(self, job_id: int, worker_id: str, sql: str, args: tuple) -> bool:
+        """Run an UPDATE on a job only while ``worker_id`` still owns it."""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                f"{sql} WHERE id = ? AND worker = ? AND status = 'running'",
+                args + (job_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """Extend the lease on a running job.
+
+        Returns:
+            False if the worker no longer owns the job
+        """
+        now = time.time()
+        return self._update_owned(
+            job_id, worker_id,
+            "UPDATE jobs SET lease_expires = ?, updated = ?",
+            (now + self.lease_seconds, now)
+        )
+
+    def complete(self, job_id: int, worker_id: str) -> bool:
+        """Mark a job as done.
+
+        Returns:
+            False if the worker no longer owns the job
+        """
+        return self._update_owned(
+            job_id, worker_id,
+            "UPDATE jobs SET status = 'done', lease_expires = NULL, updated = ?",
+            (time.time(),)
+        )
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        """Record a failed attempt, requeueing the job if attempts remain.
+
+        Returns:
+            False if the worker no longer owns the job
+        """
+        return self._update_owned(
+            job_id, worker_id,
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' "
+            "ELSE 'pending' END, lease_expires = NULL, error = ?, updated = ?",
+            (self.max_attempts, error, time.time())
+        )
+
+    def counts(self) -> dict:
+        """Return the number of jobs in each status."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        return {status: count for status, count in rows}
+
+
+class QueueWorker:
+    """Claims jobs from a JobQueue and renders them until told to stop."""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        worker_id: str = None,
+        poll_interval: float = 2.0,
+        heartbeat_interval: float = None
+    ) -> None:
+        """Initialize the worker.
+
+        Args:
+            queue: The job queue to consume
+            worker_id: Identifier stored with claimed jobs (defaults to host:pid)
+            poll_interval: Seconds to wait when the queue is empty
+            heartbeat_interval: Seconds between lease renewals
+                               (defaults to a third of the lease)
+        """
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval or queue.lease_seconds / 3
+
+    def _heartbeat_loop(self, job: Job, stop: threading.Event) -> None:
+        """Renew the lease on ``job`` until ``stop`` is set."""
+        while not stop.wait(self.heartbeat_interval):
+            if not self.queue.heartbeat(job.id, self.worker_id):
+                return
+
+    def process(self, job: Job) -> bool:
+        """Render a single claimed job while keeping its lease alive.
+
+        The video is rendered to a temporary file next to the output and only
+        moved into place once the queue confirms this worker still owns the
+        job, so a worker that lost its lease never overwrites the output of
+        the worker that reclaimed it. The job is reported done only after
+        the output is in place. PNG sequences are rendered to a temporary
+        frame folder that replaces the output's.
+
+        Returns:
+            True if the job rendered successfully
+        """
+        output_file = Path(job.output_file)
+        partial_file = output_file.with_name(
+            f".{output_file.stem}.{job.id}.{os.getpid()}.partial{output_file.suffix}"
+        )
+        rendered, destination = partial_file, output_file
+        if lookup_output_format(output_file.suffix).sequence:
+            rendered, destination = partial_file.with_suffix(""), output_file.with_suffix("")
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat_loop, args=(job, stop), daemon=True
+        )
+        heartbeat.start()
+        try:
+            processor = BatchProcessor(
+                visualizer_type=job.visualizer_type,
+                max_duration=job.params.get("max_duration"),
+                pipelined=job.params.get("pipelined", False),
+                analysis_rate=job.params.get("analysis_rate"),
+            )
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            image_file = job.params.get("image_file")
+            processor.render_file(
+                Path(job.audio_file), partial_file,
+                Path(image_file) if image_file else None
+            )
+        except Exception as e:
+            stop.set()
+            heartbeat.join()
+            _remove(rendered)
+            self.queue.fail(job.id, self.worker_id, str(e))
+            print(f"✗ Job {job.id} failed (attempt {job.attempts}): {e}")
+            return False
+
+        stop.set()
+        heartbeat.join()
+        # Renew the lease once more, so it cannot be reclaimed while the
+        # output is moved into place
+        if not self.queue.heartbeat(job.id, self.worker_id):
+            _remove(rendered)
+            print(f"✗ Job {job.id} lost its lease; discarded the render")
+            return False
+        try:
+            _move_into_place(rendered, destination)
+        except OSError as e:
+            _remove(rendered)
+            self.queue.fail(job.id, self.worker_id, str(e))
+            print(f"✗ Job {job.id} failed (attempt {job.attempts}): {e}")
+            return False
+        if not self.queue.complete(job.id, self.worker_id):
+            print(f"✗ Job {job.id} lost its lease after writing {output_file}")
+            return False
+        print(f"✓ Job {job.id} completed: {output_file}")
+        return True
+
+    def run(self, max_jobs: int = None, exit_when_empty: bool = False) -> int:
+        """Claim and render jobs in a loop.
+
+        Args:
+            max_jobs: Stop after this many jobs (None for no limit)
+            exit_when_empty: Return instead of polling when the queue is empty
+
+        Returns:
+            Number of jobs processed
+        """
+        processed = 0
+        while max_jobs is None or processed < max_jobs:
+            job = self.queue.claim(self.worker_id)
+            if job is None:
+                if exit_when_empty:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            print(f"Worker {self.worker_id} processing job {job.id}: {job.audio_file}")
+            self.process(job)
+            processed += 1
+        return processed
+
+
+def _remove(path: Path) -> None:
+    """Delete a rendered file or frame folder if it exists."""
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def _move_into_place(rendered: Path, destination: Path) -> None:
+    """Replace ``destination`` with a rendered file or frame folder."""
+    if rendered.is_dir() and destination.is_dir():
+        shutil.rmtree(destination)
+    os.replace(rendered, destination)
@@ -0,0 +1,286 @@
+"""Cheap per-file probing and longest-job-first ordering for batches."""
+
+from dataclasses import dataclass
+from pathlib import Path
+import soundfile as sf
+from PIL import Image
+from ..visualization.base import BaseVisualizer
+from ..visualization.encoder import segment_path
+from ..visualization.waveform_visualizer import WaveformVisualizer
+
+# Size of a waveform frame
+WAVEFORM_PIXELS = WaveformVisualizer.WIDTH * WaveformVisualizer.HEIGHT
+
+# soundfile decodes to float64
+SAMPLE_BYTES = 8
+# Interpreter, numpy/matplotlib and one ffmpeg process per job
+BASE_MEMORY = 200 * 1024 ** 2
+# Encoder queue sizes tried when streaming, largest first
+QUEUE_SIZES = (32, 8, 2)
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+@dataclass
+class RenderJob:
+    """An audio file to render, with the metadata used to schedule it."""
+
+    audio_file: Path
+    image_file: Path
+    output_file: Path
+    duration: float
+    sample_rate: int
+    channels: int
+    frames: int
+    width: int = None
+    height: int = None
+    frame_range: tuple = None
+
+    @property
+    def num_samples(self) -> int:
+        """Decoded samples per channel."""
+        return round(self.duration * self.sample_rate)
+
+    @property
+    def frames_to_render(self) -> int:
+        """Frames this job renders (its segment's frames if split)."""
+        if self.frame_range is not None:
+            start, stop = self.frame_range
+            return stop - start
+        return self.frames
+
+    @property
+    def pixels(self) -> int:
+        """Pixels per rendered frame."""
+        if self.width is None:
+            return WAVEFORM_PIXELS
+        return self.width * self.height
+
+    @property
+    def cost(self) -> int:
+        """Estimated render cost: pixels produced by this job."""
+        return self.frames_to_render * self.pixels
+
+
+@dataclass
+class ExecutionPlan:
+    """How to run one job within a memory budget."""
+
+    pipelined: bool
+    queue_size: int
+    # Estimated peak memory in bytes
+    memory: int
+    # Too big to share the budget: run it with no other job
+    exclusive: bool = False
+    # Exceeds the whole budget even when streamed
+    over_budget: bool = False
+
+
+def probe_job(
+    audio_file: Path,
+    image_file: Path,
+    output_file: Path,
+    max_duration: float = None
+) -> RenderJob:
+    """Read audio and image metadata without decoding either.
+
+    ``sf.info`` only parses the audio header, and PIL reads image dimensions
+    from the header until pixel data is requested.
+
+    Args:
+        audio_file: Path to the audio file
+        image_file: Paired image (None for the waveform visualizer)
+        output_file: Output path for the job
+        max_duration: Maximum duration in seconds to process (None for full duration)
+
+    Returns:
+        The probed job
+    """
+    info = sf.info(str(audio_file))
+    num_samples = info.frames
+    if max_duration is not None:
+        num_samples = min(num_samples, int(info.samplerate * max_duration))
+    width = height = None
+    if image_file is not None:
+        with Image.open(image_file) as image:
+            width, height = image.size
+    return RenderJob(
+        audio_file=Path(audio_file),
+        image_file=Path(image_file) if image_file is not None else None,
+        output_file=Path(output_file),
+        duration=num_samples / info.samplerate,
+        sample_rate=info.samplerate,
+        channels=info.channels,
+        frames=BaseVisualizer.count_frames(num_samples),
+        width=width,
+        height=height,
+    )
+
+
+def longest_first(jobs: list) -> list:
+    """Order jobs by descending estimated cost (longest-processing-time first).
+
+    Dispatching the biggest jobs first keeps a very long file from starting
+    last and leaving every other worker idle while it finishes.
+    """
+    return sorted(jobs, key=lambda job: job.cost, reverse=True)
+
+
+def split_job(job: RenderJob, segment_frames: int) -> list:
+    """Split a job into frame-range segments of at most ``segment_frames``.
+
+    Returns:
+        Segment jobs in playback order (just ``[job]`` if it is short enough)
+    """
+    if job.frames <= segment_frames:
+        return [job]
+    segments = []
+    for start in range(0, job.frames, segment_frames):
+        stop = min(start + segment_frames, job.frames)
+        segment_file = segment_path(job.output_file, start)
+        segments.append(RenderJob(
+            audio_file=job.audio_file,
+            image_file=job.image_file,
+            output_file=segment_file,
+            duration=job.duration,
+            sample_rate=job.sample_rate,
+            channels=job.channels,
+            frames=job.frames,
+            width=job.width,
+            height=job.height,
+            frame_range=(start, stop),
+        ))
+    return segments
+
+
+def parse_memory_size(value: str) -> int:
+    """Parse a size such as "512M", "2G" or "1.5GB" into bytes.
+
+    Raises:
+        ValueError: If the value is not a size
+    """
+    number = value.strip().upper()
+    for suffix in ("B", "I"):
+        if number.endswith(suffix):
+            number = number[:-1]
+    unit = number[-1:] if number[-1:] in SIZE_UNITS else ""
+    size = float(number[:len(number) - len(unit)]) * SIZE_UNITS[unit]
+    if size <= 0:
+        raise ValueError(f"Memory size must be positive: {value}")
+    return int(size)
+
+
+def estimate_memory(
+    job: RenderJob,
+    pipelined: bool,
+    queue_size: int = QUEUE_SIZES[0],
+    bytes_per_pixel: float = 3
+) -> int:
+    """Estimate the peak memory of a job in bytes.
+
+    Counts the decoded audio (all channels plus the mono mix), the decoded
+    base image, and the rendered frames held at once: every frame when
+    buffered, the encoder queue plus the frames in flight when streamed.
+
+    Args:
+        job: The probed job
+        pipelined: Whether frames are streamed to the encoder
+        queue_size: Encoder queue size when streamed
+        bytes_per_pixel: Size of a rendered frame per pixel (1 gray,
+                         1.5 yuv420p, 3 RGB, 4 RGBA)
+    """
+    audio = job.num_samples * (job.channels + 1) * SAMPLE_BYTES
+    image = job.pixels * 4 if job.width is not None else 0
+    held = queue_size + 2 if pipelined else job.frames_to_render
+    return BASE_MEMORY + audio + image + int(held * job.pixels * bytes_per_pixel)
+
+
+class MemoryPlanner:
+    """Pick buffered or streamed rendering per job within a memory limit.
+
+    Each of the ``jobs`` concurrent slots gets an equal share of the limit.
+    A job is buffered if that fits its share, and otherwise streamed with
+    the largest encoder queue that fits. Jobs that only fit the whole limit
+    run exclusively; jobs that do not fit at all are streamed with the
+    smallest queue, exclusively, and flagged as over budget.
+    """
+
+    def __init__(
+        self,
+        memory_limit: int,
+        jobs: int = 1,
+        pipelined: bool = False,
+        bytes_per_pixel: float = 3
+    ) -> None:
+        """Initialize the planner.
+
+        Args:
+            memory_limit: Memory budget in bytes for all concurrent jobs
+            jobs: Number of jobs meant to run at once
+            pipelined: Always stream, even when buffering would fit
+            bytes_per_pixel: Size of a rendered frame per pixel
+        """
+        self.memory_limit = memory_limit
+        self.jobs = max(1, jobs)
+        self.pipelined = pipelined
+        self.bytes_per_pixel = bytes_per_pixel
+
+    def plan(self, job: RenderJob) -> ExecutionPlan:
+        """Plan one job."""
+        share = self.memory_limit // self.jobs
+        if not self.pipelined:
+            memory = estimate_memory(job, False, bytes_per_pixel=self.bytes_per_pixel)
+            if memory <= share:
+                return ExecutionPlan(False, QUEUE_SIZES[0], memory)
+
+        for budget, exclusive in ((share, False), (self.memory_limit, True)):
+            for queue_size in QUEUE_SIZES:
+                memory = estimate_memory(job, True, queue_size, self.bytes_per_pixel)
+                if memory <= budget:
+                    return ExecutionPlan(True, queue_size, memory, exclusive=exclusive)
+
+        return ExecutionPlan(
+            True, QUEUE_SIZES[-1], memory, exclusive=True, over_budget=True
+        )
+
+
+class Admission:
+    """Admission control for tasks run on a pool of ``slots`` workers.
+
+    A task is admitted while a slot is free and, with a memory limit, while
+    the estimates of the running tasks plus its own fit the limit. Exclusive
+    tasks only start when nothing else runs and keep everything else out.
+    The first task is always admitted, so an over-budget task still runs.
+    """
+
+    def __init__(self, slots: int, memory_limit: int = None) -> None:
+        """Initialize the admission control.
+
+        Args:
+            slots: Number of tasks that may run at once
+            memory_limit: Memory budget in bytes (None for no limit)
+        """
+        self.slots = slots
+        self.memory_limit = memory_limit
+        self.running = []
+        self.used_memory = 0
+
+    def admits(self, plan: ExecutionPlan) -> bool:
+        """Whether a task with this plan may start now."""
+        if len(self.running) >= self.slots:
+            return False
+        if not self.running:
+            return True
+        if plan.exclusive or any(other.exclusive for other in self.running):
+            return False
+        return self.memory_limit is None or self.used_memory + plan.memory <= self.memory_limit
+
+    def start(self, plan: ExecutionPlan) -> None:
+        """Record that a task was started."""
+        self.running.append(plan)
+        self.used_memory += plan.memory
+
+    def finish(self, plan: ExecutionPlan) -> None:
+        """Record that a started task ended."""
+        self.running.remove(plan)
+        self.used_memory -= plan.memory
@@ -0,0 +1,207 @@
+"""Long-lived local render server with a pool of pre-warmed workers."""
+
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from .batch import BatchProcessor
+
+
+def _warm_worker() -> None:
+    """Import the rendering stack once, when a worker process starts."""
+    import matplotlib.pyplot  # noqa: F401
+    import numpy  # noqa: F401
+    import PIL.Image  # noqa: F401
+    import soundfile  # noqa: F401
+    from ..visualization import encoder
+
+    encoder.ffmpeg_exe()
+
+
+def _ready() -> int:
+    """Return the worker's pid; used to force every worker to start."""
+    time.sleep(0.1)
+    return os.getpid()
+
+
+def render_job(job: dict) -> float:
+    """Render one job in a worker process.
+
+    Args:
+        job: Render request, see RenderServer
+
+    Returns:
+        Render time in seconds
+    """
+    start = time.perf_counter()
+    processor = BatchProcessor(
+        visualizer_type=job.get("type", "waveform"),
+        max_duration=job.get("max_duration"),
+        pipelined=job.get("pipelined", False),
+        analysis_rate=job.get("analysis_rate"),
+    )
+    image_file = job.get("image")
+    output_file = Path(job["output"])
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    processor.render_file(
+        Path(job["input"]), output_file, Path(image_file) if image_file else None
+    )
+    return time.perf_counter() - start
+
+
+class RenderServer:
+    """HTTP server that renders jobs on a pool of warm worker processes.
+
+    Workers import numpy, matplotlib, PIL and soundfile once at startup and
+    keep decoded base images cached by path and modification time, so a
+    request only pays for the render itself.
+
+    Endpoints:
+        GET /health: Server status and worker count
+        POST /render: JSON body with ``input`` and ``output`` paths and
+            optional ``type``, ``image``, ``max_duration``, ``pipelined`` and
+            ``analysis_rate``
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, workers: int = None) -> None:
+        """Initialize the server.
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port)
+            workers: Number of worker processes (defaults to the CPU count)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        """Base URL the server listens on."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_pool(self) -> None:
+        """Start the worker processes and wait until all of them are warm."""
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        futures = [self.pool.submit(_ready) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def serve_forever(self) -> None:
+        """Warm the pool and handle requests until shutdown() is called."""
+        if self.pool is None:
+            self.start_pool()
+        print(f"Render server listening on {self.url} with {self.workers} worker(s)")
+        self.httpd.serve_forever()
+
+    def start(self) -> threading.Thread:
+        """Serve from a background thread (used by tests and embedders)."""
+        self.start_pool()
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self) -> None:
+        """Stop serving and terminate the worker pool."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def _handler_class(self):
+        """Build the request handler bound to this server."""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status: int, body: dict) -> None:
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                if self.path != "/health":
+                    self._reply(404, {"status": "error", "error": "not found"})
+                    return
+                self._reply(200, {"status": "ok", "workers": server.workers})
+
+            def do_POST(self) -> None:
+                if self.path != "/render":
+                    self._reply(404, {"status": "error", "error": "not found"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    job = json.loads(self.rfile.read(length))
+                    if not isinstance(job, dict) or "input" not in job or "output" not in job:
+                        raise ValueError("'input' and 'output' are required")
+                    if job.get("type", "waveform") not in BatchProcessor.VISUALIZER_TYPES:
+                        raise ValueError(f"Unknown visualizer type: {job['type']}")
+                except ValueError as e:
+                    self._reply(400, {"status": "error", "error": str(e)})
+                    return
+                try:
+                    seconds = server.pool.submit(render_job, job).result()
+                except Exception as e:
+                    self._reply(500, {"status": "error", "error": str(e)})
+                    return
+                self._reply(200, {"status": "ok", "output": job["output"], "seconds": seconds})
+
+            def log_message(self, format: str, *args) -> None:
+                print(f"{self.address_string()} {format % args}")
+
+        return Handler
+
+
+class RenderClient:
+    """Minimal client for a RenderServer."""
+
+    def __init__(self, url: str = "http://127.0.0.1:8765", timeout: float = None) -> None:
+        """Initialize the client.
+
+        Args:
+            url: Base URL of the server
+            timeout: Request timeout in seconds (None waits for the render)
+        """
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path: str, body: dict = None) -> dict:
+        """Send a request and decode the JSON reply, raising on errors."""
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(
+            f"{self.url}{path}", data=data,
+            headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            reply = json.loads(e.read() or b"{}")
+            raise RuntimeError(reply.get("error", str(e))) from None
+
+    def health(self) -> dict:
+        """Return the server status."""
+        return self._request("/health")
+
+    def render(self, input_file: str, output_file: str, **params) -> dict:
+        """Render one file and wait for it to finish.
+
+        Args:
+            input_file: Path to the audio file (as seen by the server)
+            output_file: Output path (as seen by the server)
+            **params: type, image, max_duration, pipelined or analysis_rate
+
+        Returns:
+            The server's reply, including the render time in seconds
+        """
+        job = {"input": str(input_file), "output": str(output_file), **params}
+        return self._request("/render", job)
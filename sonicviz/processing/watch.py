@@ -0,0 +1,244 @@
+"""Watch a folder and render audio files as they arrive."""
+
+import heapq
+import itertools
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from ..visualization import ImageAnimatorVisualizer
+from .index import AudioIndex
+from .scheduling import probe_job
+
+
+def file_signature(path: Path) -> tuple:
+    """Return the current (size, mtime_ns) of a file, or None if it is gone."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class FolderWatcher:
+    """Polls a folder and renders new audio files, shortest first.
+
+    Every poll rescans the folder through an :class:`AudioIndex`, which only
+    lists directories whose modification time changed, so an idle tree costs
+    one ``stat`` per directory. The index is persisted in the processor's
+    index file, if it has one.
+
+    A new or changed file is rendered once its size and modification time
+    (and those of its paired image, which the image visualizer waits for)
+    have not changed for ``settle_polls`` polls, so files still being copied
+    or uploaded are left alone. Files whose output is already newer than
+    them are skipped. Ready files are rendered on a pool of the processor's
+    ``jobs`` workers, shortest first, within its memory limit if it has one.
+
+    Files are only checked for changes when their directory's listing
+    changed: writing to a new name and renaming it into place is picked up,
+    rewriting an already rendered file in place is not. A file is never
+    queued again while it is queued or rendering.
+    """
+
+    def __init__(
+        self,
+        processor,
+        input_folder: Path,
+        output_folder: str = None,
+        interval: float = 2.0,
+        settle_polls: int = 1
+    ) -> None:
+        """Initialize the watcher.
+
+        Args:
+            processor: BatchProcessor holding the render settings
+            input_folder: Folder to watch
+            output_folder: Output folder path (defaults to input_folder_output)
+            interval: Seconds between polls
+            settle_polls: Polls a file must stay unchanged before it is rendered
+        """
+        self.processor = processor
+        self.input_folder = Path(input_folder)
+        if output_folder is None:
+            output_folder = self.input_folder.parent / f"{self.input_folder.name}_output"
+        self.output_folder = Path(output_folder)
+        self.interval = interval
+        self.settle_polls = settle_polls
+        self.index = None
+        if processor.index_file is not None:
+            self.index = AudioIndex.load(processor.index_file)
+        # Audio file -> settled (audio, image) signatures when it was last
+        # rendered or skipped
+        self.handled = {}
+        # Audio file -> [current signatures, unchanged polls]
+        self.pending = {}
+        self.waiting_for_image = set()
+        # Heap of (frames, sequence number, job) ready to render
+        self.ready = []
+        self._sequence = itertools.count()
+        # Audio files queued or rendering, never queued twice
+        self.active = set()
+        # Finished audio files to check for changes made while they rendered
+        self.recheck = set()
+
+    def scan(self) -> tuple:
+        """Rescan the folder, persisting the index if it changed.
+
+        Returns:
+            Tuple of the index and the set of directories (index keys) that
+            were listed again since the previous scan
+        """
+        previous = self.index
+        self.index = AudioIndex.scan(
+            self.input_folder, self.processor.AUDIO_EXTENSIONS, previous
+        )
+        previous_directories = previous.directories if previous is not None else {}
+        relisted = {
+            rel_dir for rel_dir, entry in self.index.directories.items()
+            if previous_directories.get(rel_dir, {}).get("mtime_ns") != entry["mtime_ns"]
+        }
+        if self.processor.index_file is not None and (
+            previous is None or previous_directories != self.index.directories
+        ):
+            self.index.save(self.processor.index_file)
+        return self.index, relisted
+
+    def poll(self) -> list:
+        """Rescan the folder and queue the files that are ready to render.
+
+        Returns:
+            The RenderJobs queued by this poll
+        """
+        index, relisted = self.scan()
+        needs_image = self.processor.visualizer_class == ImageAnimatorVisualizer
+        pairs = dict(index.pairs())
+        for audio_file in set(self.handled) - set(pairs):
+            del self.handled[audio_file]
+        for audio_file, image_file in pairs.items():
+            if audio_file in self.pending or audio_file in self.active:
+                continue
+            rel_dir = os.path.relpath(audio_file.parent, self.input_folder)
+            if (
+                audio_file in self.handled
+                and rel_dir not in relisted
+                and audio_file not in self.recheck
+            ):
+                continue
+            image_file = image_file if needs_image else None
+            if self._signatures(audio_file, image_file) != self.handled.get(audio_file):
+                self.pending[audio_file] = [None, 0]
+        self.recheck.clear()
+
+        queued = []
+        for audio_file in list(self.pending):
+            if audio_file not in pairs:
+                del self.pending[audio_file]
+                self.waiting_for_image.discard(audio_file)
+                continue
+            image_file = pairs[audio_file]
+            if needs_image and image_file is None:
+                if audio_file not in self.waiting_for_image:
+                    print(f"… Waiting for {audio_file.with_suffix(index.IMAGE_EXTENSION).name}")
+                    self.waiting_for_image.add(audio_file)
+                continue
+            self.waiting_for_image.discard(audio_file)
+            if not needs_image:
+                image_file = None
+
+            entry = self.pending[audio_file]
+            current = self._signatures(audio_file, image_file)
+            if current != entry[0] or current[0] is None:
+                entry[0], entry[1] = current, 0
+                continue
+            entry[1] += 1
+            if entry[1] < self.settle_polls:
+                continue
+
+            del self.pending[audio_file]
+            self.handled[audio_file] = current
+            job = self._probe(audio_file, image_file, current)
+            if job is not None:
+                heapq.heappush(self.ready, (job.frames, next(self._sequence), job))
+                self.active.add(audio_file)
+                queued.append(job)
+        return queued
+
+    def finished(self, audio_file: Path) -> None:
+        """Record that a queued file's render ended, successfully or not.
+
+        The file is checked for changes on the next poll, in case it was
+        replaced while it rendered.
+        """
+        self.active.discard(audio_file)
+        self.recheck.add(audio_file)
+
+    @staticmethod
+    def _signatures(audio_file: Path, image_file: Path) -> tuple:
+        """Current (audio, image) signatures of a job's inputs."""
+        return (
+            file_signature(audio_file),
+            file_signature(image_file) if image_file else None
+        )
+
+    def _probe(self, audio_file: Path, image_file: Path, signatures: tuple):
+        """Probe a settled file, or return None if its output is up to date."""
+        output_file = self.output_folder / f"{audio_file.stem}{self.processor.output_format}"
+        output = file_signature(output_file)
+        newest = max(signature[1] for signature in signatures if signature is not None)
+        if output is not None and output[1] >= newest:
+            return None
+        try:
+            return probe_job(audio_file, image_file, output_file, self.processor.max_duration)
+        except Exception as e:
+            print(f"✗ Error reading {audio_file.name}: {e}\n")
+            return None
+
+    def run(self, once: bool = False) -> None:
+        """Poll and render until interrupted.
+
+        Args:
+            once: Return as soon as every file found is rendered and nothing
+                  is left settling (files still waiting for an image are
+                  left alone)
+        """
+        processor = self.processor
+        self.output_folder.mkdir(parents=True, exist_ok=True)
+        print(f"Watching folder: {self.input_folder}")
+        print(f"Output folder: {self.output_folder}\n")
+        running = {}
+        admission = processor.admission()
+        with ProcessPoolExecutor(max_workers=processor.jobs) as pool:
+            while True:
+                self.poll()
+                while self.ready:
+                    job = self.ready[0][2]
+                    plan = processor.plan_execution(job)
+                    if not admission.admits(plan):
+                        break
+                    heapq.heappop(self.ready)
+                    print(f"Rendering: {job.audio_file.name}")
+                    future = pool.submit(
+                        processor.render_file, job.audio_file, job.output_file,
+                        job.image_file, None, plan.pipelined, plan.queue_size
+                    )
+                    running[future] = (job, plan)
+                    admission.start(plan)
+
+                settling = set(self.pending) - self.waiting_for_image
+                if once and not (running or self.ready or settling):
+                    return
+                if not running:
+                    time.sleep(self.interval)
+                    continue
+                done, _ = wait(running, timeout=self.interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job, plan = running.pop(future)
+                    admission.finish(plan)
+                    self.finished(job.audio_file)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"✗ Error processing {job.audio_file.name}: {e}\n")
+                    else:
+                        print(f"✓ Completed: {job.output_file}\n")
@@ -3,5 +3,25 @@
 from .base import BaseVisualizer
 from .waveform_visualizer import WaveformVisualizer
 from .image_animator import ImageAnimatorVisualizer
+from .layered import LayeredVisualizer
+from .compositing import Layer, LayerStack, SolidLayer
+from .curves import waveform_windows, image_curve, save_curve, load_curve
+from .memory import render_to_bytes, render_to_stream
+from .segment_cache import SegmentCache
 
-__all__ = ["BaseVisualizer", "WaveformVisualizer", "ImageAnimatorVisualizer"]
+__all__ = [
+    "BaseVisualizer",
+    "WaveformVisualizer",
+    "ImageAnimatorVisualizer",
+    "LayeredVisualizer",
+    "Layer",
+    "LayerStack",
+    "SolidLayer",
+    "waveform_windows",
+    "image_curve",
+    "save_curve",
+    "load_curve",
+    "render_to_bytes",
+    "render_to_stream",
+    "SegmentCache",
+]
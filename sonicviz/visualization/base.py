@@ -1,81 +1,452 @@
 """Abstract base class for audio visualizers."""
 
 from abc import ABC, abstractmethod
+from pathlib import Path
 import numpy as np
 import soundfile as sf
+from numpy.lib.stride_tricks import sliding_window_view
+from .encoder import (
+    FFmpegWriter, concat_segments, create_writer, encode_segments, is_path
+)
+from .formats import get_output_format, lookup_output_format
+from .pipeline import FramePipeline
+from .resample import BLOCK_SIZE, array_blocks, decimate, decimation_factor
+from .segment_cache import segment_key
+
+
+def pcm_to_float(samples) -> np.ndarray:
+    """Scale integer PCM samples to floats in [-1, 1].
+
+    Signed integers are divided by their type's maximum and unsigned ones
+    (offset binary, e.g. 8-bit WAV) are centered first. Float samples are
+    returned unchanged and are expected to be in [-1, 1] already.
+    """
+    samples = np.asarray(samples)
+    if samples.dtype.kind == "i":
+        return samples / np.float32(np.iinfo(samples.dtype).max)
+    if samples.dtype.kind == "u":
+        middle = np.float32(np.iinfo(samples.dtype).max // 2 + 1)
+        return (samples - middle) / middle
+    return samples
 
 
 class BaseVisualizer(ABC):
     """Abstract base class for audio visualizations."""
 
-    def __init__(self, audio_file: str, output_file: str = "output.mp4", max_duration: float = None) -> None:
+    WINDOW = 2048
+    HOP_LENGTH = WINDOW // 4
+    # Length of the segments stored in a segment cache
+    SEGMENT_SECONDS = 10
+    # Canvas color for output formats without alpha
+    BACKGROUND = (0, 0, 0)
+    # Raw pixel format render_frame produces (see encoder.PIXEL_FORMAT_BYTES);
+    # None for RGB or RGBA frames recognized by their shape
+    PIXEL_FORMAT = None
+
+    def __init__(
+        self,
+        audio_file,
+        output_file="output.mp4",
+        max_duration: float = None,
+        output_format: str = None,
+        analysis_rate: int = None
+    ) -> None:
         """Initialize the visualizer with input and output paths.
 
         Args:
-            audio_file: Path to the input audio file
-            output_file: Path for the output video file
+            audio_file: Path to the input audio file, a binary file-like object
+                        holding an encoded audio file, or a (samples, sample_rate)
+                        tuple of decoded PCM: floats in [-1, 1] or integers,
+                        which are scaled to that range
+            output_file: Path for the output video file, or a binary writable
+                         that receives the encoded video
             max_duration: Maximum duration in seconds to process (None for full duration)
+            output_format: Output extension such as ".webm" (defaults to the
+                           output file's extension, or ".mp4" for writables)
+            analysis_rate: Analyze the audio at no less than this sample rate,
+                           decimating higher-rate sources (None for the native
+                           rate). The output keeps the original audio.
         """
+        if analysis_rate is not None and analysis_rate <= 0:
+            raise ValueError(f"Analysis rate must be positive: {analysis_rate}")
         self.audio_file = audio_file
         self.output_file = output_file
+        if output_format is not None:
+            self.output_format = lookup_output_format(output_format)
+        elif is_path(output_file):
+            self.output_format = get_output_format(output_file)
+        else:
+            self.output_format = lookup_output_format(".mp4")
+        if not is_path(output_file) and self.output_format.muxer is None:
+            raise ValueError(f"{self.output_format.name} output cannot be written to a stream")
         self.max_duration = max_duration
-        self.window = 2048
-        self.hop_length = self.window // 4
+        self.analysis_rate = analysis_rate
+        # Decimation applied to y for analysis, and y's length before it
+        self.decimation = 1
+        self.num_samples = None
+        self.source_audio = None
+        self.window = self.WINDOW
+        self.hop_length = self.HOP_LENGTH
+        # (start, stop) frames to render; the output then has no audio, so
+        # segments can be joined and muxed with the audio once
+        self.frame_range = None
         self.frames = []
         self.y = None
         self.sr = None
         self.amplitude_history = None
+        self.motion_curve = None
 
     def load_audio(self) -> None:
-        """Load audio file and prepare it for processing."""
-        self.y, self.sr = sf.read(self.audio_file)
-        if len(self.y.shape) > 1:
-            # Convert stereo to mono by averaging both channels
-            self.y = np.mean(self.y, axis=1)
+        """Load audio file and prepare it for processing.
+
+        With an analysis_rate, the mono mix is low-pass filtered and
+        decimated for analysis. Audio files are then read and decimated
+        block by block, so the full-rate signal is never held in memory.
+        """
+        if isinstance(self.audio_file, tuple):
+            samples, self.sr = self.audio_file
+            self.y = pcm_to_float(samples)
+        elif is_path(self.audio_file) and self.analysis_rate is not None:
+            self._load_decimated()
+            return
+        else:
+            self.y, self.sr = sf.read(self.audio_file)
 
         # Trim to max_duration if specified
         if self.max_duration is not None:
             max_samples = int(self.sr * self.max_duration)
             self.y = self.y[:max_samples]
 
-        duration = len(self.y) / self.sr
-        print(f"Audio loaded. Duration: {duration:.2f}s, Sample rate: {self.sr} Hz")
+        if not is_path(self.audio_file):
+            # In-memory audio is muxed from the decoded samples
+            self.source_audio = self.y
+
+        if len(self.y.shape) > 1:
+            # Convert stereo to mono by averaging both channels
+            self.y = np.mean(self.y, axis=1)
+
+        self.num_samples = len(self.y)
+        self.decimation = decimation_factor(
+            self.sr, self.analysis_rate, self.window, self.hop_length
+        )
+        if self.decimation > 1:
+            self.y = np.concatenate(list(decimate(array_blocks(self.y), self.decimation)))
+        self._print_loaded()
+
+    def _load_decimated(self) -> None:
+        """Read an audio file in blocks, mixing to mono and decimating each."""
+        with sf.SoundFile(self.audio_file) as audio:
+            self.sr = audio.samplerate
+            frames = audio.frames
+            if self.max_duration is not None:
+                frames = min(frames, int(self.sr * self.max_duration))
+            self.num_samples = frames
+            self.decimation = decimation_factor(
+                self.sr, self.analysis_rate, self.window, self.hop_length
+            )
+            blocks = (
+                block.mean(axis=1) if block.ndim > 1 else block
+                for block in audio.blocks(blocksize=BLOCK_SIZE, frames=frames)
+            )
+            self.y = np.concatenate([np.zeros(0), *decimate(blocks, self.decimation)])
+        self._print_loaded()
+
+    def _print_loaded(self) -> None:
+        """Report the loaded audio."""
+        duration = self.num_samples / self.sr
+        message = f"Audio loaded. Duration: {duration:.2f}s, Sample rate: {self.sr} Hz"
+        if self.decimation > 1:
+            message += f" (analyzed at {self.sr / self.decimation:g} Hz)"
+        print(message)
+
+    def load_resources(self) -> None:
+        """Load inputs other than the audio (e.g. images); nothing by default."""
 
     def compute_amplitude_history(self) -> None:
-        """Pre-compute amplitude for all frames."""
-        print("Computing amplitude history...")
-        self.amplitude_history = []
-        for i in range(0, len(self.y) - self.window, self.hop_length):
-            slice_data = self.y[i:i + self.window]
-            amplitude = np.sqrt(np.mean(slice_data ** 2))
-            self.amplitude_history.append(amplitude)
+        """Pre-compute amplitude for all frames.
 
-        if len(self.amplitude_history) == 0:
+        The RMS of every window is computed at once over a strided view of
+        the squared signal. With decimated audio the window and hop are
+        scaled down by the same factor, so frames keep their timing.
+        """
+        print("Computing amplitude history...")
+        num_samples = self.num_samples if self.num_samples is not None else len(self.y)
+        frame_count = len(range(0, num_samples - self.window, self.hop_length))
+        if frame_count == 0:
             raise ValueError("No amplitude data computed from audio file")
 
-        max_amplitude = max(self.amplitude_history)
+        window = self.window // self.decimation
+        hop_length = self.hop_length // self.decimation
+        squares = np.square(self.y, dtype=np.float64)
+        windows = sliding_window_view(squares, window)[::hop_length][:frame_count]
+        amplitudes = np.sqrt(windows.mean(axis=1))
+
+        max_amplitude = amplitudes.max()
         if max_amplitude > 0:
-            self.amplitude_history = [a / max_amplitude for a in self.amplitude_history]
+            amplitudes /= max_amplitude
+        self.amplitude_history = amplitudes
 
-    @abstractmethod
-    def generate_frames(self) -> None:
-        """Generate all frames for the visualization.
+        self.motion_curve = self.compute_motion_curve()
 
-        Must be implemented by subclasses.
+    def compute_motion_curve(self) -> np.ndarray:
+        """Compute the per-frame visual parameters from amplitude_history.
+
+        Subclasses override this to precompute everything render_frame needs,
+        one row per frame (see the curves module).
+
+        Returns:
+            Array with one entry per frame
         """
-        pass
+        return np.asarray(self.amplitude_history, dtype=np.float64)
+
+    @classmethod
+    def count_frames(cls, num_samples: int) -> int:
+        """Number of frames compute_amplitude_history yields for a signal length."""
+        return len(range(0, num_samples - cls.WINDOW, cls.HOP_LENGTH))
+
+    def frame_indices(self) -> range:
+        """Indices of the frames to render (all of them unless frame_range is set)."""
+        if self.frame_range is None:
+            return range(len(self.amplitude_history))
+        start, stop = self.frame_range
+        return range(start, min(stop, len(self.amplitude_history)))
+
+    @property
+    def fps(self) -> float:
+        """Video frame rate: one frame per hop of audio."""
+        return self.sr / self.hop_length
+
+    def background_color(self) -> tuple:
+        """Canvas color: transparent for formats with alpha, BACKGROUND otherwise."""
+        if self.output_format.alpha:
+            return (0, 0, 0, 0)
+        return self.BACKGROUND
+
+    def layers(self, width: int, height: int) -> list:
+        """Compositing layers drawing this visualizer on a shared canvas.
+
+        Used to stack visualizers (see LayeredVisualizer); the background
+        is not part of the layers.
+
+        Args:
+            width: Canvas width in pixels
+            height: Canvas height in pixels
+
+        Returns:
+            Layers from bottom to top
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot be stacked")
+
+    def segment_curve(self, start: int, stop: int) -> np.ndarray:
+        """Motion curve rows that determine frames [start, stop)."""
+        return self.motion_curve[start:stop]
 
     @abstractmethod
-    def create_video(self) -> None:
-        """Create the output video file.
+    def render_frame(self, frame_idx: int) -> np.ndarray:
+        """Render a single frame.
 
         Must be implemented by subclasses.
+
+        Args:
+            frame_idx: Index of the frame in amplitude_history
+
+        Returns:
+            Frame in the visualizer's PIXEL_FORMAT: by default an (H, W, 3)
+            RGB or, for output formats with alpha, (H, W, 4) RGBA array
         """
         pass
 
-    def run(self) -> None:
-        """Execute the complete visualization pipeline."""
+    def generate_frames(self) -> None:
+        """Generate all frames for the visualization."""
+        print("Generating frames...")
+        indices = self.frame_indices()
+        for count, frame_idx in enumerate(indices, 1):
+            self.frames.append(self.render_frame(frame_idx))
+
+            if count % 100 == 0:
+                print(f"  Generated {count}/{len(indices)} frames")
+
+    def _create_writer(self):
+        """Create the writer for the output file's format."""
+        if self.frame_range is not None:
+            return create_writer(
+                self.output_file, self.fps, output_format=self.output_format,
+                pixel_format=self.PIXEL_FORMAT
+            )
+        if is_path(self.audio_file):
+            return create_writer(
+                self.output_file, self.fps,
+                audio_file=self.audio_file,
+                audio_duration=self.max_duration,
+                output_format=self.output_format,
+                pixel_format=self.PIXEL_FORMAT
+            )
+        return create_writer(
+            self.output_file, self.fps,
+            audio_file=(self.source_audio, self.sr),
+            output_format=self.output_format,
+            pixel_format=self.PIXEL_FORMAT
+        )
+
+    def can_encode_segments(self) -> bool:
+        """Whether the output can be encoded as segments and joined losslessly.
+
+        Needs a video file output whose audio, if any, comes from a file.
+        """
+        return (
+            is_path(self.output_file)
+            and not self.output_format.sequence
+            and not self.output_format.palette
+            and (self.frame_range is not None or is_path(self.audio_file))
+        )
+
+    def create_video(self, encoder_jobs: int = 1) -> None:
+        """Encode the buffered frames into the output file.
+
+        Args:
+            encoder_jobs: Number of ffmpeg processes encoding GOP-aligned
+                          segments in parallel (falls back to one when the
+                          output cannot be joined from segments)
+        """
+        print("Creating video...")
+        if encoder_jobs > 1 and self.can_encode_segments():
+            encode_segments(
+                self.frames, self.output_file, self.fps, encoder_jobs,
+                audio_file=self.audio_file if self.frame_range is None else None,
+                audio_duration=self.max_duration,
+                output_format=self.output_format,
+                pixel_format=self.PIXEL_FORMAT
+            )
+            print("Done!")
+            return
+        writer = self._create_writer()
+        try:
+            for frame in self.frames:
+                writer.write_frame(frame)
+            writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+        print("Done!")
+
+    def stream_video(self, queue_size: int = 32) -> None:
+        """Render frames and encode them concurrently, without buffering.
+
+        Frames are handed to an ffmpeg process through a bounded queue as
+        they are rendered, so rendering and encoding overlap and at most
+        ``queue_size`` frames are held in memory.
+
+        Args:
+            queue_size: Maximum number of rendered frames waiting for the encoder
+        """
+        print("Rendering and encoding video...")
+        writer = self._create_writer()
+        indices = self.frame_indices()
+        try:
+            FramePipeline(
+                lambda i: self.render_frame(indices[i]), len(indices),
+                writer.write_frame, queue_size
+            ).run()
+            writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+        print("Done!")
+
+    def cache_params(self) -> dict:
+        """Visual parameters that, with the motion curve, determine the frames.
+
+        Subclasses add whatever render_frame reads besides the motion curve.
+        """
+        return {
+            "visualizer": type(self).__name__,
+            "fps": self.fps,
+            "format": self.output_format.name,
+            "video_args": self.output_format.video_args,
+            "pixel_format": self.PIXEL_FORMAT,
+        }
+
+    def _encode_range(self, start: int, stop: int, output_file, keyframe_interval: int) -> None:
+        """Render and encode frames [start, stop) as a silent segment."""
+        writer = FFmpegWriter(
+            output_file, self.fps, output_format=self.output_format,
+            keyframe_interval=keyframe_interval, pixel_format=self.PIXEL_FORMAT
+        )
+        try:
+            for frame_idx in range(start, stop):
+                writer.write_frame(self.render_frame(frame_idx))
+            writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+
+    def render_with_cache(self, cache) -> None:
+        """Encode the video from cached segments, rendering only changed ones.
+
+        The timeline is cut into SEGMENT_SECONDS segments at fixed positions.
+        Each is keyed by cache_params() and its slice of the motion curve, so
+        after an edit only segments whose frames change are rendered again;
+        all of them are then joined and the audio muxed once. The amplitude
+        envelope is normalized by its maximum, so an edit that changes the
+        loudest point invalidates every segment.
+
+        Args:
+            cache: SegmentCache holding encoded segments
+        """
+        keyframe_interval = max(1, round(self.fps))
+        length = keyframe_interval * self.SEGMENT_SECONDS
+        frame_count = len(self.motion_curve)
+        params = self.cache_params()
+        suffix = Path(self.output_file).suffix
+        segment_files = []
+        rendered = 0
+        for start in range(0, frame_count, length):
+            stop = min(start + length, frame_count)
+            key = segment_key(params, self.segment_curve(start, stop))
+            segment_file = cache.get(key, suffix)
+            if segment_file is None:
+                segment_file = cache.put(
+                    key, suffix,
+                    lambda path: self._encode_range(start, stop, path, keyframe_interval)
+                )
+                rendered += 1
+            segment_files.append(segment_file)
+        print(f"Rendered {rendered}/{len(segment_files)} segment(s), reused the rest")
+
+        concat_segments(
+            segment_files, self.output_file, self.audio_file, self.max_duration
+        )
+        cache.evict(keep=segment_files)
+        print("Done!")
+
+    def run(
+        self,
+        pipelined: bool = False,
+        queue_size: int = 32,
+        encoder_jobs: int = 1,
+        cache=None
+    ) -> None:
+        """Execute the complete visualization pipeline.
+
+        Audio is always decoded and its amplitude envelope computed in full
+        first, because the envelope is normalized by its global maximum. With
+        ``pipelined`` only the render and encode stages then overlap.
+
+        Args:
+            pipelined: Overlap rendering with encoding instead of rendering
+                       every frame before the encoder starts
+            queue_size: Maximum number of frames waiting for the encoder
+                        when pipelined
+            encoder_jobs: Parallel segment encoders for buffered renders
+            cache: SegmentCache to reuse encoded segments from (ignored for
+                   outputs that cannot be joined from segments)
+        """
         self.load_audio()
         self.compute_amplitude_history()
-        self.generate_frames()
-        self.create_video()
+        if cache is not None and self.frame_range is None and self.can_encode_segments():
+            self.render_with_cache(cache)
+        elif pipelined:
+            self.stream_video(queue_size)
+        else:
+            self.generate_frames()
+            self.create_video(encoder_jobs)
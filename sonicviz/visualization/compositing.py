@@ -0,0 +1,152 @@
+"""Frame compositing from a stack of static and dynamic layers.
+
+A frame is built bottom to top from layers. Static layers (backgrounds,
+fixed artwork) are rasterized once and kept; only dynamic layers are
+rendered for every frame and alpha-composited into a buffer that is reused
+from frame to frame. Stacking the layers of several visualizers renders
+them together in one pass.
+"""
+
+import numpy as np
+from PIL import Image
+
+
+class Layer:
+    """One layer of a frame.
+
+    Subclasses set ``static`` and implement render(). A static layer is
+    rendered once, with ``frame_idx`` None.
+    """
+
+    static = False
+
+    def render(self, frame_idx: int) -> tuple:
+        """Rasterize the layer.
+
+        Args:
+            frame_idx: Index of the frame (None for static layers)
+
+        Returns:
+            Tuple of an RGBA image and the (x, y) canvas position of its
+            top-left corner
+        """
+        raise NotImplementedError
+
+
+class SolidLayer(Layer):
+    """A static layer filling the canvas with one color."""
+
+    static = True
+
+    def __init__(self, width: int, height: int, color: tuple) -> None:
+        """Initialize the layer.
+
+        Args:
+            width: Canvas width in pixels
+            height: Canvas height in pixels
+            color: RGB or RGBA color
+        """
+        self.width = width
+        self.height = height
+        self.color = tuple(color) + (255,) * (4 - len(color))
+
+    def render(self, frame_idx: int = None) -> tuple:
+        """Return the solid canvas."""
+        return Image.new('RGBA', (self.width, self.height), self.color), (0, 0)
+
+
+def centered(width: int, height: int, image: Image.Image) -> tuple:
+    """Position that centers ``image`` on a width x height canvas."""
+    return (width - image.width) // 2, (height - image.height) // 2
+
+
+def composite(canvas: Image.Image, image: Image.Image, position: tuple) -> None:
+    """Alpha-composite an RGBA image over a canvas in place.
+
+    On an RGB (opaque) canvas the image is pasted through its own alpha
+    mask, which is the same blend and cheaper. Parts of the image outside
+    the canvas are clipped.
+
+    Args:
+        canvas: RGB or RGBA destination
+        image: RGBA source
+        position: (x, y) canvas position of the source's top-left corner
+    """
+    if canvas.mode == 'RGB':
+        canvas.paste(image, position, image)
+        return
+    x, y = position
+    left, top = max(-x, 0), max(-y, 0)
+    right = min(image.width, canvas.width - x)
+    bottom = min(image.height, canvas.height - y)
+    if left >= right or top >= bottom:
+        return
+    canvas.alpha_composite(image, (x + left, y + top), (left, top, right, bottom))
+
+
+class LayerStack:
+    """Composites layers, bottom first, into frames of a fixed size."""
+
+    def __init__(self, width: int, height: int, layers: list, alpha: bool = False) -> None:
+        """Initialize the stack.
+
+        Args:
+            width: Frame width in pixels
+            height: Frame height in pixels
+            layers: Layers from bottom to top
+            alpha: Produce RGBA frames instead of RGB
+        """
+        self.width = width
+        self.height = height
+        self.layers = layers
+        self.alpha = alpha
+        self.base = None
+        self.buffer = None
+        self.first_dynamic = None
+        self.static_images = {}
+
+    def render_static(self) -> None:
+        """Flatten the bottom static layers and keep the other static rasters.
+
+        Called on the first render; later calls do nothing. If the flattened
+        base is opaque and no alpha is wanted, frames are composited in RGB.
+        """
+        if self.base is not None:
+            return
+        base = Image.new('RGBA', (self.width, self.height), (0, 0, 0, 0))
+        flattening = True
+        for idx, layer in enumerate(self.layers):
+            if not layer.static:
+                flattening = False
+            elif flattening:
+                composite(base, *layer.render(None))
+            else:
+                self.static_images[idx] = layer.render(None)
+        if not self.alpha and base.getextrema()[3][0] == 255:
+            base = base.convert('RGB')
+        self.base = base
+        self.buffer = base.copy()
+        self.first_dynamic = next(
+            (idx for idx, layer in enumerate(self.layers) if not layer.static),
+            len(self.layers)
+        )
+
+    def render(self, frame_idx: int) -> np.ndarray:
+        """Composite one frame.
+
+        Args:
+            frame_idx: Index of the frame passed to dynamic layers
+
+        Returns:
+            A new (H, W, 4) RGBA or (H, W, 3) RGB uint8 array
+        """
+        self.render_static()
+        self.buffer.paste(self.base)
+        for idx in range(self.first_dynamic, len(self.layers)):
+            if idx in self.static_images:
+                composite(self.buffer, *self.static_images[idx])
+            else:
+                composite(self.buffer, *self.layers[idx].render(frame_idx))
+        if self.alpha or self.buffer.mode == 'RGB':
+            return np.array(self.buffer)
+        return np.array(self.buffer.convert('RGB'))
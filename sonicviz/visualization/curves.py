@@ -0,0 +1,89 @@
+"""Per-frame visual parameters ("motion curves") computed up front as arrays.
+
+Renderers consume these arrays one row per frame instead of deriving their
+parameters inside the render loop. The curves only depend on the amplitude
+envelope and a few constants, so they can also be saved and reused by other
+tools.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+IMAGE_CURVE_DTYPE = np.dtype([
+    ("intensity", "f8"),
+    ("scale", "f8"),
+    ("saturation", "f8"),
+])
+
+
+def waveform_windows(amplitude_history, history_length: int) -> np.ndarray:
+    """Return the amplitude window shown in every waveform frame.
+
+    Row ``i`` holds the ``history_length`` amplitudes ending at frame ``i``,
+    left-padded with zeros at the start of the track. The result is a
+    read-only view over a single padded copy of the envelope, not one array
+    per frame.
+
+    Args:
+        amplitude_history: Normalized amplitude per frame
+        history_length: Number of amplitudes visible in a frame
+
+    Returns:
+        Array of shape (frames, history_length)
+    """
+    amplitudes = np.asarray(amplitude_history, dtype=np.float64)
+    padded = np.concatenate([np.zeros(history_length - 1), amplitudes])
+    return sliding_window_view(padded, history_length)
+
+
+def image_curve(
+    amplitude_history,
+    min_scale: float,
+    max_scale: float,
+    min_saturation: float,
+    max_saturation: float,
+    threshold: float
+) -> np.ndarray:
+    """Map intensities to image scale and saturation for every frame.
+
+    Scale grows linearly with intensity. Saturation is ``min_saturation``
+    below ``threshold`` and grows linearly from there up to
+    ``max_saturation`` at full intensity.
+
+    Args:
+        amplitude_history: Normalized amplitude per frame
+        min_scale: Scale at zero intensity
+        max_scale: Scale at full intensity
+        min_saturation: Saturation below the threshold
+        max_saturation: Saturation at full intensity
+        threshold: Intensity below which saturation is forced to the minimum
+
+    Returns:
+        Structured array with fields intensity, scale and saturation
+    """
+    intensity = np.asarray(amplitude_history, dtype=np.float64)
+    curve = np.empty(len(intensity), dtype=IMAGE_CURVE_DTYPE)
+    curve["intensity"] = intensity
+    curve["scale"] = min_scale + (max_scale - min_scale) * intensity
+    normalized = (intensity - threshold) / (1.0 - threshold)
+    curve["saturation"] = np.where(
+        intensity < threshold,
+        min_saturation,
+        min_saturation + (max_saturation - min_saturation) * normalized,
+    )
+    return curve
+
+
+def save_curve(path: str, curve: np.ndarray) -> None:
+    """Save a motion curve as a .npy file.
+
+    Args:
+        path: Destination file
+        curve: Array returned by one of the curve functions
+    """
+    np.save(path, np.ascontiguousarray(curve), allow_pickle=False)
+
+
+def load_curve(path: str) -> np.ndarray:
+    """Load a motion curve saved with :func:`save_curve`."""
+    return np.load(path, allow_pickle=False)
@@ -0,0 +1,502 @@
+"""Streaming video encoding through an ffmpeg subprocess."""
+
+import os
+import shutil
+import subprocess
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+import imageio_ffmpeg
+from PIL import Image
+from .formats import OutputFormat, get_output_format
+
+# Raw pixel formats inferred from the channel count of (H, W[, C]) frames
+INPUT_PIXEL_FORMATS = {1: "gray", 3: "rgb24", 4: "rgba"}
+# Bytes per pixel of each raw pixel format a renderer can produce. yuv420p
+# frames are planar I420 in one (H * 3 // 2, W) array.
+PIXEL_FORMAT_BYTES = {"gray": 1, "yuv420p": 1.5, "rgb24": 3, "rgba": 4}
+
+
+def is_path(target) -> bool:
+    """Whether an audio/video source or target is a filesystem path."""
+    return isinstance(target, (str, os.PathLike))
+
+
+def frame_pixel_format(frame: np.ndarray) -> str:
+    """Pixel format of a frame judged by its shape (gray, rgb24 or rgba)."""
+    channels = 1 if frame.ndim == 2 else frame.shape[2]
+    return INPUT_PIXEL_FORMATS[channels]
+
+
+def frame_dimensions(frame: np.ndarray, pixel_format: str) -> tuple:
+    """(width, height) of the picture stored in a raw frame."""
+    rows, width = frame.shape[:2]
+    if pixel_format == "yuv420p":
+        return width, rows * 2 // 3
+    return width, rows
+
+
+def ffmpeg_exe() -> str:
+    """Return the ffmpeg binary bundled with imageio-ffmpeg."""
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+class FFmpegWriter:
+    """Writes raw frames to an ffmpeg process as they are produced.
+
+    The process is started on the first frame, once the frame size and
+    channel count are known, and encodes concurrently with whatever produces
+    the frames. RGBA frames are passed to ffmpeg as they are, so formats with
+    alpha need no extra conversion pass.
+
+    Audio can come from a file or from samples in memory, and the output can
+    be a file or any binary writable; in-memory data is exchanged with ffmpeg
+    through pipes rather than temporary files.
+    """
+
+    def __init__(
+        self,
+        output_file: str,
+        fps: float,
+        audio_file=None,
+        audio_duration: float = None,
+        output_format: OutputFormat = None,
+        keyframe_interval: int = None,
+        pixel_format: str = None
+    ) -> None:
+        """Initialize the writer.
+
+        Args:
+            output_file: Path for the output video file, or a binary writable
+                         that receives the encoded stream
+            fps: Frame rate of the video
+            audio_file: Audio file to mux into the video, or a
+                        (samples, sample_rate) tuple of float samples in
+                        [-1, 1] (None for no audio)
+            audio_duration: Seconds of audio to keep (None for all of it)
+            output_format: Format to encode (defaults to the one registered
+                           for the output file's extension; required when
+                           writing to a stream)
+            keyframe_interval: Fixed GOP length in frames, so segments cut on
+                               multiples of it start on a keyframe (None for
+                               the encoder's default)
+            pixel_format: Raw format of the frames (see PIXEL_FORMAT_BYTES);
+                          None infers gray, rgb24 or rgba from the first
+                          frame's shape
+        """
+        if output_format is None:
+            if not is_path(output_file):
+                raise ValueError("An output format is required when writing to a stream")
+            output_format = get_output_format(output_file)
+        if not is_path(output_file) and output_format.muxer is None:
+            raise ValueError(f"{output_format.name} output cannot be written to a stream")
+        self.output_file = output_file
+        self.fps = fps
+        self.audio_file = audio_file
+        self.audio_duration = audio_duration
+        self.output_format = output_format
+        self.keyframe_interval = keyframe_interval
+        self.pixel_format = pixel_format
+        self.process = None
+        self.threads = []
+        self.audio_fd = None
+        self.errors = []
+
+    def _video_filters(self) -> list:
+        """Return the filters applied to the video before encoding."""
+        filters = []
+        max_fps = self.output_format.max_fps
+        if max_fps is not None and self.fps > max_fps:
+            filters.append(f"fps={max_fps}")
+        if self.output_format.subsampled:
+            # 4:2:0 chroma subsampling needs even dimensions
+            filters.append("pad=ceil(iw/2)*2:ceil(ih/2)*2")
+        return filters
+
+    def _command(self, width: int, height: int, pixel_format: str) -> list:
+        """Build the ffmpeg command line for frames of the given size."""
+        with_audio = self.audio_file is not None and self.output_format.has_audio
+        command = [
+            ffmpeg_exe(), "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", pixel_format,
+            "-s", f"{width}x{height}", "-r", f"{self.fps}",
+            "-i", "pipe:0",
+        ]
+        if with_audio and is_path(self.audio_file):
+            if self.audio_duration is not None:
+                command += ["-t", f"{self.audio_duration}"]
+            command += ["-i", str(self.audio_file)]
+        elif with_audio:
+            samples, sample_rate = self.audio_file
+            channels = 1 if samples.ndim == 1 else samples.shape[1]
+            if self.audio_duration is not None:
+                command += ["-t", f"{self.audio_duration}"]
+            command += [
+                "-f", "f32le", "-ar", f"{sample_rate}", "-ac", f"{channels}",
+                "-i", f"pipe:{self.audio_fd}",
+            ]
+
+        filters = self._video_filters()
+        if self.output_format.palette:
+            # Generate the palette once for the whole file and apply it in the
+            # same pass, instead of a separate palettegen transcode
+            chain = ",".join(filters + ["split[frames][stats]"])
+            command += [
+                "-filter_complex",
+                f"[0:v]{chain};[stats]palettegen=reserve_transparent=1[palette];"
+                "[frames][palette]paletteuse=alpha_threshold=128",
+            ]
+        elif filters:
+            command += ["-vf", ",".join(filters)]
+
+        command += self.output_format.video_args
+        if self.keyframe_interval is not None and not self.output_format.palette:
+            command += [
+                "-g", f"{self.keyframe_interval}",
+                "-keyint_min", f"{self.keyframe_interval}",
+            ]
+        if with_audio:
+            command += self.output_format.audio_args + ["-shortest"]
+        if self.output_format.muxer is not None:
+            command += ["-f", self.output_format.muxer]
+        if is_path(self.output_file):
+            command.append(str(self.output_file))
+        else:
+            command += self.output_format.stream_args + ["pipe:1"]
+        return command
+
+    def _start(self, width: int, height: int, pixel_format: str) -> None:
+        """Start ffmpeg and the threads feeding audio and draining output."""
+        audio_pipe = None
+        pass_fds = ()
+        with_audio = self.audio_file is not None and self.output_format.has_audio
+        if with_audio and not is_path(self.audio_file):
+            audio_pipe = os.pipe()
+            self.audio_fd = audio_pipe[0]
+            pass_fds = (audio_pipe[0],)
+
+        self.process = subprocess.Popen(
+            self._command(width, height, pixel_format),
+            stdin=subprocess.PIPE,
+            stdout=None if is_path(self.output_file) else subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            pass_fds=pass_fds
+        )
+        if audio_pipe is not None:
+            os.close(audio_pipe[0])
+            self._spawn(self._feed_audio, audio_pipe[1])
+        if self.process.stdout is not None:
+            self._spawn(self._drain_output)
+
+    def _spawn(self, target, *args) -> None:
+        """Run a helper in a daemon thread, recording its errors."""
+        def runner() -> None:
+            try:
+                target(*args)
+            except BaseException as e:
+                self.errors.append(e)
+
+        thread = threading.Thread(target=runner, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def _feed_audio(self, fd: int) -> None:
+        """Write in-memory samples to ffmpeg's audio pipe."""
+        samples = np.ascontiguousarray(self.audio_file[0], dtype="<f4")
+        try:
+            with os.fdopen(fd, "wb") as pipe:
+                pipe.write(memoryview(samples).cast("B"))
+        except BrokenPipeError:
+            # ffmpeg stops reading once -shortest has ended the output
+            pass
+
+    def _drain_output(self) -> None:
+        """Copy the encoded stream from ffmpeg to the output writable."""
+        while True:
+            chunk = self.process.stdout.read(1 << 16)
+            if not chunk:
+                return
+            self.output_file.write(chunk)
+
+    def write_frame(self, frame: np.ndarray) -> None:
+        """Send one uint8 frame to the encoder.
+
+        Frames are passed in their own pixel format, (H, W) gray, (H, W, 3)
+        RGB or (H, W, 4) RGBA unless the writer was given another one, so
+        ffmpeg converts them straight to the codec's format.
+        """
+        if self.process is None:
+            if self.pixel_format is None:
+                self.pixel_format = frame_pixel_format(frame)
+            width, height = frame_dimensions(frame, self.pixel_format)
+            self._start(width, height, self.pixel_format)
+        try:
+            self.process.stdin.write(np.ascontiguousarray(frame, dtype=np.uint8).tobytes())
+        except BrokenPipeError:
+            self._fail()
+
+    def close(self) -> None:
+        """Flush the remaining frames and wait for ffmpeg to finish."""
+        if self.process is None:
+            raise ValueError("No frames were written")
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = self.process.wait()
+        for thread in self.threads:
+            thread.join()
+        if returncode != 0:
+            self._fail()
+        if self.errors:
+            raise self.errors[0]
+
+    def abort(self) -> None:
+        """Kill ffmpeg and remove the partial output file."""
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            for stream in (self.process.stdin, self.process.stderr):
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+            for thread in self.threads:
+                thread.join()
+        if is_path(self.output_file):
+            Path(self.output_file).unlink(missing_ok=True)
+
+    def _fail(self) -> None:
+        """Raise an error carrying ffmpeg's own message."""
+        self.process.kill()
+        self.process.wait()
+        message = self.process.stderr.read().decode(errors="replace").strip()
+        raise RuntimeError(f"ffmpeg failed writing {self.output_file}: {message}")
+
+
+class ImageSequenceWriter:
+    """Writes each frame as a numbered PNG file, compressing in parallel.
+
+    ``clip.png`` is written as ``clip/000000.png``, ``clip/000001.png``, ...
+    PNG compression runs in a thread pool (zlib releases the GIL), with a
+    bounded number of frames in flight.
+    """
+
+    def __init__(self, output_file: str, workers: int = None, pixel_format: str = None) -> None:
+        """Initialize the writer.
+
+        Args:
+            output_file: Path ending in .png; its stem names the frame folder
+            workers: Number of compression threads (defaults to the CPU count)
+            pixel_format: Raw format of the frames (gray, rgb24 or rgba; None
+                          infers it from their shape)
+        """
+        if pixel_format == "yuv420p":
+            raise ValueError("PNG sequences need gray, rgb24 or rgba frames")
+        self.output_file = output_file
+        self.directory = Path(output_file).with_suffix("")
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = None
+        self.pending = deque()
+        self.frame_count = 0
+        self.created_directory = False
+
+    def write_frame(self, frame: np.ndarray) -> None:
+        """Queue one frame for compression."""
+        if self.executor is None:
+            self.created_directory = not self.directory.exists()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        image = Image.fromarray(np.asarray(frame, dtype=np.uint8))
+        path = self.directory / f"{self.frame_count:06d}.png"
+        self.pending.append(self.executor.submit(image.save, path))
+        self.frame_count += 1
+        while len(self.pending) > 2 * self.workers:
+            self.pending.popleft().result()
+
+    def close(self) -> None:
+        """Wait for every frame to be written."""
+        if self.executor is None:
+            raise ValueError("No frames were written")
+        try:
+            while self.pending:
+                self.pending.popleft().result()
+        finally:
+            self.executor.shutdown()
+
+    def abort(self) -> None:
+        """Stop writing and remove the frames written so far."""
+        if self.executor is not None:
+            for future in self.pending:
+                future.cancel()
+            self.executor.shutdown()
+        if self.created_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def create_writer(
+    output_file: str,
+    fps: float,
+    audio_file=None,
+    audio_duration: float = None,
+    output_format: OutputFormat = None,
+    pixel_format: str = None
+):
+    """Create the writer for an output file, chosen by its extension.
+
+    Args:
+        output_file: Path for the output, or a binary writable
+        fps: Frame rate of the video
+        audio_file: Audio file path or (samples, sample_rate) tuple to mux
+                    into the video (None for no audio)
+        audio_duration: Seconds of audio to keep (None for all of it)
+        output_format: Format to encode (defaults to the one registered for
+                       the output file's extension)
+        pixel_format: Raw format of the frames (None infers it from their shape)
+
+    Returns:
+        An FFmpegWriter or ImageSequenceWriter
+    """
+    if output_format is None:
+        output_format = get_output_format(output_file)
+    if output_format.sequence:
+        if not is_path(output_file):
+            raise ValueError(f"{output_format.name} output cannot be written to a stream")
+        return ImageSequenceWriter(output_file, pixel_format=pixel_format)
+    return FFmpegWriter(
+        output_file, fps, audio_file, audio_duration, output_format,
+        pixel_format=pixel_format
+    )
+
+
+def concat_segments(
+    segment_files: list,
+    output_file: str,
+    audio_file: str = None,
+    audio_duration: float = None
+) -> None:
+    """Join encoded segments without re-encoding and mux the audio once.
+
+    The segments must share codec parameters (e.g. be encoded by
+    FFmpegWriter with the same format and frame size). They are joined with
+    ffmpeg's concat demuxer and stream copy; only the audio is encoded.
+
+    Args:
+        segment_files: Segment paths in playback order
+        output_file: Path for the joined video
+        audio_file: Audio file to mux into the video (None for no audio)
+        audio_duration: Seconds of audio to keep (None for all of it)
+    """
+    output_format = get_output_format(output_file)
+    if output_format.sequence or output_format.palette:
+        raise ValueError(f"{output_format.name} output cannot be joined from segments")
+
+    list_file = Path(f"{output_file}.segments.txt")
+    lines = []
+    for segment in segment_files:
+        escaped = str(Path(segment).resolve()).replace("'", "'\\''")
+        lines.append(f"file '{escaped}'")
+    list_file.write_text("\n".join(lines) + "\n")
+
+    command = [
+        ffmpeg_exe(), "-y", "-loglevel", "error",
+        "-f", "concat", "-safe", "0", "-i", str(list_file),
+    ]
+    with_audio = audio_file is not None and output_format.has_audio
+    if with_audio:
+        if audio_duration is not None:
+            command += ["-t", f"{audio_duration}"]
+        command += ["-i", str(audio_file)]
+    command += ["-map", "0:v", "-c:v", "copy"]
+    if with_audio:
+        command += ["-map", "1:a"] + output_format.audio_args + ["-shortest"]
+    if output_format.muxer is not None:
+        command += ["-f", output_format.muxer]
+    command.append(str(output_file))
+
+    try:
+        result = subprocess.run(command, stderr=subprocess.PIPE)
+    finally:
+        list_file.unlink(missing_ok=True)
+    if result.returncode != 0:
+        Path(output_file).unlink(missing_ok=True)
+        message = result.stderr.decode(errors="replace").strip()
+        raise RuntimeError(f"ffmpeg failed joining {output_file}: {message}")
+
+
+def segment_path(output_file, start: int) -> Path:
+    """Hidden path for the segment of an output that starts at a frame."""
+    output_file = Path(output_file)
+    return output_file.with_name(f".{output_file.stem}.{start:09d}{output_file.suffix}")
+
+
+def segment_bounds(frame_count: int, segments: int, keyframe_interval: int) -> list:
+    """Split frames into at most ``segments`` GOP-aligned (start, stop) ranges.
+
+    Every range but the last is a multiple of ``keyframe_interval`` frames
+    long, so each segment starts exactly where a single encode would have
+    placed a keyframe.
+    """
+    length = -(-frame_count // max(1, segments))
+    length = -(-length // keyframe_interval) * keyframe_interval
+    return [
+        (start, min(start + length, frame_count))
+        for start in range(0, frame_count, length)
+    ]
+
+
+def encode_segments(
+    frames: list,
+    output_file: str,
+    fps: float,
+    workers: int,
+    audio_file: str = None,
+    audio_duration: float = None,
+    output_format: OutputFormat = None,
+    pixel_format: str = None
+) -> None:
+    """Encode frames as GOP-aligned segments in parallel ffmpeg processes.
+
+    Each ffmpeg process is fed its own frame range from a thread; the
+    segments are then joined with concat_segments and the audio muxed once.
+    The GOP is one second, so segment boundaries fall on keyframes.
+
+    Args:
+        frames: Rendered frames in playback order
+        output_file: Path for the joined video
+        fps: Frame rate of the video
+        workers: Number of parallel encoders
+        audio_file: Audio file to mux into the video (None for no audio)
+        audio_duration: Seconds of audio to keep (None for all of it)
+        output_format: Format to encode (defaults to the output's extension)
+        pixel_format: Raw format of the frames (None infers it from their shape)
+    """
+    if output_format is None:
+        output_format = get_output_format(output_file)
+    keyframe_interval = max(1, round(fps))
+    bounds = segment_bounds(len(frames), workers, keyframe_interval)
+    segment_files = [segment_path(output_file, start) for start, _ in bounds]
+
+    def encode(index: int) -> None:
+        start, stop = bounds[index]
+        writer = FFmpegWriter(
+            segment_files[index], fps, output_format=output_format,
+            keyframe_interval=keyframe_interval, pixel_format=pixel_format
+        )
+        try:
+            for frame in frames[start:stop]:
+                writer.write_frame(frame)
+            writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(bounds)) as pool:
+            list(pool.map(encode, range(len(bounds))))
+        concat_segments(segment_files, output_file, audio_file, audio_duration)
+    finally:
+        for segment_file in segment_files:
+            segment_file.unlink(missing_ok=True)
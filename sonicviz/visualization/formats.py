@@ -0,0 +1,134 @@
+"""Output formats, keyed by the extension of the output file."""
+
+from pathlib import Path
+
+
+class OutputFormat:
+    """Describes how frames (and audio) are encoded for one kind of output."""
+
+    def __init__(
+        self,
+        name: str,
+        video_args: list = None,
+        audio_args: list = None,
+        alpha: bool = False,
+        palette: bool = False,
+        sequence: bool = False,
+        subsampled: bool = False,
+        max_fps: float = None,
+        muxer: str = None,
+        stream_args: list = None
+    ) -> None:
+        """Initialize an output format.
+
+        Args:
+            name: Short human-readable name
+            video_args: ffmpeg output arguments for the video stream
+            audio_args: ffmpeg output arguments for the audio stream
+                        (None if the format carries no audio)
+            alpha: Whether the format stores transparency, so renderers
+                   should produce RGBA frames with a transparent background
+            palette: Whether a palette is generated once per file and applied
+                     to every frame in the same ffmpeg pass
+            sequence: Whether frames are written as individual image files
+            subsampled: Whether chroma is 4:2:0 subsampled, which requires
+                        even frame dimensions
+            max_fps: Highest frame rate the format plays back reliably
+            muxer: ffmpeg muxer name, needed when writing to a stream
+                   (None if the format cannot be streamed)
+            stream_args: Extra muxer arguments when writing to a stream
+        """
+        self.name = name
+        self.video_args = video_args or []
+        self.audio_args = audio_args
+        self.alpha = alpha
+        self.palette = palette
+        self.sequence = sequence
+        self.subsampled = subsampled
+        self.max_fps = max_fps
+        self.muxer = muxer
+        self.stream_args = stream_args or []
+
+    @property
+    def has_audio(self) -> bool:
+        """Whether the format carries an audio stream."""
+        return self.audio_args is not None
+
+
+OUTPUT_FORMATS = {
+    ".mp4": OutputFormat(
+        "MP4/H.264",
+        video_args=["-c:v", "libx264", "-pix_fmt", "yuv420p"],
+        audio_args=["-c:a", "aac"],
+        subsampled=True,
+        muxer="mp4",
+        # A seekable moov atom cannot be written to a pipe
+        stream_args=["-movflags", "frag_keyframe+empty_moov"],
+    ),
+    ".webm": OutputFormat(
+        "WebM/VP9",
+        video_args=[
+            "-c:v", "libvpx-vp9", "-pix_fmt", "yuva420p",
+            "-crf", "32", "-b:v", "0", "-row-mt", "1",
+        ],
+        audio_args=["-c:a", "libopus"],
+        alpha=True,
+        subsampled=True,
+        muxer="webm",
+    ),
+    ".gif": OutputFormat(
+        "animated GIF",
+        palette=True,
+        alpha=True,
+        # Browsers slow down GIF frame delays shorter than 2/100 s
+        max_fps=50,
+        muxer="gif",
+    ),
+    ".apng": OutputFormat(
+        "animated PNG",
+        video_args=["-c:v", "apng", "-pix_fmt", "rgba", "-plays", "0"],
+        alpha=True,
+        muxer="apng",
+    ),
+    ".png": OutputFormat(
+        "PNG sequence",
+        alpha=True,
+        sequence=True,
+    ),
+}
+
+
+def lookup_output_format(extension: str) -> OutputFormat:
+    """Look up an output format by extension.
+
+    Args:
+        extension: Registered extension, including the dot (e.g. ".webm")
+
+    Returns:
+        The registered output format
+
+    Raises:
+        ValueError: If the extension is not registered
+    """
+    extension = extension.lower()
+    if extension not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Unknown output format: {extension or '(none)'}. "
+            f"Available formats: {', '.join(OUTPUT_FORMATS.keys())}"
+        )
+    return OUTPUT_FORMATS[extension]
+
+
+def get_output_format(output_file: str) -> OutputFormat:
+    """Look up the output format for a file name.
+
+    Args:
+        output_file: Output path; its extension selects the format
+
+    Returns:
+        The registered output format
+
+    Raises:
+        ValueError: If the extension is not registered
+    """
+    return lookup_output_format(Path(output_file).suffix)
@@ -1,13 +1,63 @@
 """Image animator visualizer that changes image size and saturation based on audio intensity."""
 
+import hashlib
+import os
+from functools import lru_cache
 from pathlib import Path
 import numpy as np
 from PIL import Image, ImageEnhance
-import soundfile as sf
-from moviepy.video.io.ImageSequenceClip import ImageSequenceClip
 from .base import BaseVisualizer
-import tempfile
-import os
+from .compositing import Layer, LayerStack, SolidLayer, centered, composite
+from .encoder import is_path
+from .curves import image_curve
+
+
+def load_image(image_file: str) -> Image.Image:
+    """Load a PNG as RGBA, reusing the decoded image while the file is unchanged.
+
+    Decoded images are cached by path, modification time and size, so a
+    long-lived process (e.g. the render server) decodes each image once.
+    The returned image is shared and must not be modified in place.
+
+    Args:
+        image_file: Path to the image file
+
+    Returns:
+        The decoded RGBA image
+    """
+    stat = os.stat(image_file)
+    return _decode_image(os.path.abspath(image_file), stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=16)
+def _decode_image(image_file: str, mtime_ns: int, size: int) -> Image.Image:
+    """Decode an image; the stat values only serve as cache key."""
+    with Image.open(image_file) as image:
+        return image.convert('RGBA')
+
+
+class ImageLayer(Layer):
+    """Dynamic layer with a visualizer's image, scaled and saturated per frame."""
+
+    def __init__(self, visualizer, width: int, height: int) -> None:
+        """Initialize the layer.
+
+        Args:
+            visualizer: ImageAnimatorVisualizer providing the image and curve
+            width: Canvas width in pixels
+            height: Canvas height in pixels
+        """
+        self.visualizer = visualizer
+        self.width = width
+        self.height = height
+
+    def render(self, frame_idx: int) -> tuple:
+        """Transform the image for the frame and center it on the canvas."""
+        params = self.visualizer.motion_curve[frame_idx]
+        transformed = self.visualizer._apply_transformations(
+            self.visualizer.base_image, params["scale"], params["saturation"]
+        )
+        return transformed, centered(self.width, self.height, transformed)
 
 
 class ImageAnimatorVisualizer(BaseVisualizer):
@@ -23,28 +73,45 @@ class ImageAnimatorVisualizer(BaseVisualizer):
     MIN_SATURATION = 0.0
     MAX_SATURATION = 2.0
     INTENSITY_THRESHOLD = 0.05  # Below this, saturation is forced to 0
+    # Magenta background for easy chroma key removal
+    BACKGROUND = (255, 0, 255)
 
     def __init__(
         self,
-        audio_file: str,
-        image_file: str = None,
-        output_file: str = "output.mp4",
-        max_duration: float = None
+        audio_file,
+        image_file=None,
+        output_file="output.mp4",
+        max_duration: float = None,
+        output_format: str = None,
+        analysis_rate: int = None
     ) -> None:
         """Initialize the image animator visualizer.
 
         Args:
-            audio_file: Path to the input audio file
-            image_file: Path to the PNG image file. If None, looks for file with
-                       same name as audio_file but with .png extension
-            output_file: Path for the output video file
+            audio_file: Path to the input audio file, a binary file-like object
+                        or a (samples, sample_rate) tuple
+            image_file: Path to the PNG image file, a binary file-like object,
+                       a PIL image or an (H, W, 3|4) uint8 array. If None, looks
+                       for file with same name as audio_file but with .png extension
+            output_file: Path for the output video file, or a binary writable
             max_duration: Maximum duration in seconds to process (None for full duration)
+            output_format: Output extension such as ".webm" (defaults to the
+                           output file's extension)
+            analysis_rate: Analyze the audio at no less than this sample rate
+                           (None for the native rate)
         """
-        super().__init__(audio_file, output_file, max_duration)
-        self.image_file = image_file or self._find_image_file(audio_file)
+        super().__init__(
+            audio_file, output_file, max_duration, output_format, analysis_rate
+        )
+        if image_file is None:
+            if not is_path(audio_file):
+                raise ValueError("image_file is required when audio is not a file path")
+            image_file = self._find_image_file(audio_file)
+        self.image_file = image_file
         self.base_image = None
         self.frame_width = None
         self.frame_height = None
+        self.stack = None
 
     def _find_image_file(self, audio_file: str) -> str:
         """Find PNG image with same name as audio file.
@@ -72,44 +139,64 @@ class ImageAnimatorVisualizer(BaseVisualizer):
     def load_audio(self) -> None:
         """Load audio file and image."""
         super().load_audio()
+        self.load_resources()
+
+    def load_resources(self) -> None:
+        """Load the image."""
         self._load_image()
 
     def _load_image(self) -> None:
         """Load and prepare the PNG image, preserving transparency."""
-        print(f"Loading image: {self.image_file}")
-        self.base_image = Image.open(self.image_file).convert('RGBA')
+        if isinstance(self.image_file, Image.Image):
+            self.base_image = self.image_file.convert('RGBA')
+        elif isinstance(self.image_file, np.ndarray):
+            self.base_image = Image.fromarray(self.image_file).convert('RGBA')
+        elif is_path(self.image_file):
+            print(f"Loading image: {self.image_file}")
+            self.base_image = load_image(self.image_file)
+        else:
+            self.base_image = Image.open(self.image_file).convert('RGBA')
         self.frame_width, self.frame_height = self.base_image.size
         print(f"Image loaded. Size: {self.frame_width}x{self.frame_height}")
 
+    def compute_motion_curve(self) -> np.ndarray:
+        """Precompute scale and saturation for every frame."""
+        return image_curve(
+            self.amplitude_history,
+            self.MIN_SCALE, self.MAX_SCALE,
+            self.MIN_SATURATION, self.MAX_SATURATION,
+            self.INTENSITY_THRESHOLD
+        )
+
+    def cache_params(self) -> dict:
+        """Add the animation constants and a digest of the base image."""
+        params = super().cache_params()
+        params.update(
+            scale=(self.MIN_SCALE, self.MAX_SCALE),
+            saturation=(self.MIN_SATURATION, self.MAX_SATURATION),
+            threshold=self.INTENSITY_THRESHOLD,
+            alpha=self.output_format.alpha,
+            image_size=(self.frame_width, self.frame_height),
+            image=hashlib.sha256(self.base_image.tobytes()).hexdigest(),
+        )
+        return params
+
     def _apply_transformations(
         self,
         image: Image.Image,
-        intensity: float
+        scale: float,
+        saturation: float
     ) -> Image.Image:
-        """Apply size and saturation transformations based on intensity.
+        """Apply size and saturation transformations.
 
         Args:
             image: The base image to transform
-            intensity: Normalized intensity value (0-1)
+            scale: Size factor relative to the original image
+            saturation: Saturation factor (0 is grayscale)
 
         Returns:
             Transformed image
         """
-        # Calculate scale factor (size)
-        scale = self.MIN_SCALE + (self.MAX_SCALE - self.MIN_SCALE) * intensity
-
-        # Calculate saturation factor (0 when below threshold)
-        if intensity < self.INTENSITY_THRESHOLD:
-            saturation = self.MIN_SATURATION
-        else:
-            # Map intensity to saturation, starting from threshold
-            normalized_intensity = (intensity - self.INTENSITY_THRESHOLD) / (
-                1.0 - self.INTENSITY_THRESHOLD
-            )
-            saturation = self.MIN_SATURATION + (
-                self.MAX_SATURATION - self.MIN_SATURATION
-            ) * normalized_intensity
-
         # Apply size transformation
         new_width = int(self.frame_width * scale)
         new_height = int(self.frame_height * scale)
@@ -124,77 +211,51 @@ class ImageAnimatorVisualizer(BaseVisualizer):
 
         return saturated
 
+    @property
+    def frame_size(self) -> tuple:
+        """(width, height) of a rendered frame: the image's size."""
+        return self.frame_width, self.frame_height
+
+    def layers(self, width: int, height: int) -> list:
+        """Draw the animated image centered on the canvas."""
+        return [ImageLayer(self, width, height)]
+
+    def _layer_stack(self) -> LayerStack:
+        """Background plus image layers; the background is rasterized once."""
+        if self.stack is None:
+            width, height = self.frame_size
+            self.stack = LayerStack(width, height, [
+                SolidLayer(width, height, self.background_color()),
+                *self.layers(width, height),
+            ], alpha=self.output_format.alpha)
+        return self.stack
+
     def _center_on_canvas(self, image: Image.Image) -> Image.Image:
         """Center the image on a canvas of original size.
 
-        Uses magenta (#FF00FF) as background for easy chroma key removal in video editors.
-        Preserves image transparency via alpha compositing.
+        For output formats with alpha the canvas is transparent. Otherwise it
+        uses magenta (#FF00FF) as background for easy chroma key removal in
+        video editors. Preserves image transparency via alpha compositing.
 
         Args:
             image: Image to center (RGBA format)
 
         Returns:
-            Image centered on canvas with magenta background
+            Image centered on canvas (RGBA with alpha output, RGB otherwise)
         """
-        # Magenta background for easy chroma key removal
-        canvas = Image.new('RGBA', (self.frame_width, self.frame_height), (255, 0, 255, 255))
-        x_offset = (self.frame_width - image.width) // 2
-        y_offset = (self.frame_height - image.height) // 2
-        # Use alpha_composite to preserve transparency
-        canvas.paste(image, (x_offset, y_offset), image)
-        # Convert back to RGB for video encoding
-        return canvas.convert('RGB')
-
-    def generate_frames(self) -> None:
-        """Generate all frames by transforming the image based on amplitude."""
-        print("Generating frames...")
-        for frame_idx, intensity in enumerate(self.amplitude_history):
-            # Apply transformations
-            transformed = self._apply_transformations(self.base_image, intensity)
-
-            # Center on canvas
-            framed = self._center_on_canvas(transformed)
-
-            # Convert to numpy array for moviepy
-            frame_array = np.array(framed)
-            self.frames.append(frame_array)
-
-            if (frame_idx + 1) % 100 == 0:
-                print(f"  Generated {frame_idx + 1}/{len(self.amplitude_history)} frames")
-
-    def create_video(self) -> None:
-        """Create the output video file with audio."""
-        print("Creating video...")
-        fps = self.sr / self.hop_length
-        clip = ImageSequenceClip(self.frames, fps=fps)
-
-        # If max_duration was specified, save trimmed audio to temporary file
-        audio_file_to_use = self.audio_file
-        temp_audio = None
-
-        if self.max_duration is not None:
-            # Create temporary audio file with trimmed content
-            temp_fd, temp_audio = tempfile.mkstemp(suffix='.wav')
-            os.close(temp_fd)
-            try:
-                sf.write(temp_audio, self.y, self.sr)
-                audio_file_to_use = temp_audio
-            except Exception as e:
-                print(f"Warning: Could not write temp audio file: {e}")
-                audio_file_to_use = self.audio_file
-
-        try:
-            clip.write_videofile(
-                self.output_file,
-                audio=audio_file_to_use,
-                codec='libx264',
-                audio_codec='aac'
-            )
-            print("Done!")
-        finally:
-            # Clean up temporary file if created
-            if temp_audio and os.path.exists(temp_audio):
-                try:
-                    os.remove(temp_audio)
-                except OSError:
-                    pass
+        stack = self._layer_stack()
+        stack.render_static()
+        canvas = stack.base.copy()
+        composite(canvas, image, centered(self.frame_width, self.frame_height, image))
+        if canvas.mode == 'RGBA' and not self.output_format.alpha:
+            # Convert back to RGB for video encoding
+            return canvas.convert('RGB')
+        return canvas
+
+    def render_frame(self, frame_idx: int) -> np.ndarray:
+        """Render one frame by transforming the image based on amplitude.
+
+        The background is rasterized once; only the image layer is rendered
+        and composited per frame.
+        """
+        return self._layer_stack().render(frame_idx)
@@ -0,0 +1,113 @@
+"""Visualizer stacking the layers of several visualizers in one render."""
+
+import numpy as np
+from .base import BaseVisualizer
+from .compositing import LayerStack, SolidLayer
+
+
+class LayeredVisualizer(BaseVisualizer):
+    """Renders several visualizers of the same audio as one composited video.
+
+    The audio is decoded and analyzed once and shared with every visualizer;
+    each contributes its layers to a single stack, the first visualizer at
+    the bottom. The frame has the first visualizer's size and background,
+    e.g. a waveform drawn over an animated image::
+
+        LayeredVisualizer("song.wav", [
+            ImageAnimatorVisualizer("song.wav", "cover.png"),
+            WaveformVisualizer("song.wav"),
+        ], "song.mp4").run()
+
+    The visualizers' own output and duration settings are ignored.
+    """
+
+    def __init__(
+        self,
+        audio_file,
+        visualizers: list,
+        output_file="output.mp4",
+        max_duration: float = None,
+        output_format: str = None,
+        analysis_rate: int = None
+    ) -> None:
+        """Initialize the layered visualizer.
+
+        Args:
+            audio_file: Path to the input audio file, a binary file-like object
+                        or a (samples, sample_rate) tuple
+            visualizers: Visualizers to stack, bottom first
+            output_file: Path for the output video file, or a binary writable
+            max_duration: Maximum duration in seconds to process (None for full duration)
+            output_format: Output extension such as ".webm" (defaults to the
+                           output file's extension)
+            analysis_rate: Analyze the audio at no less than this sample rate
+                           (None for the native rate)
+        """
+        if not visualizers:
+            raise ValueError("At least one visualizer is required")
+        super().__init__(
+            audio_file, output_file, max_duration, output_format, analysis_rate
+        )
+        self.visualizers = visualizers
+        self.stack = None
+
+    def load_audio(self) -> None:
+        """Load the audio once and every visualizer's other inputs."""
+        super().load_audio()
+        self.load_resources()
+
+    def load_resources(self) -> None:
+        """Load the visualizers' other inputs (e.g. images)."""
+        for visualizer in self.visualizers:
+            visualizer.load_resources()
+
+    def compute_motion_curve(self) -> np.ndarray:
+        """Share the amplitude envelope and compute every visualizer's curve."""
+        for visualizer in self.visualizers:
+            visualizer.sr = self.sr
+            visualizer.hop_length = self.hop_length
+            visualizer.output_format = self.output_format
+            visualizer.amplitude_history = self.amplitude_history
+            visualizer.motion_curve = visualizer.compute_motion_curve()
+        self.stack = None
+        return super().compute_motion_curve()
+
+    @property
+    def frame_size(self) -> tuple:
+        """(width, height) of the bottom visualizer's frames."""
+        return self.visualizers[0].frame_size
+
+    def background_color(self) -> tuple:
+        """The bottom visualizer's background."""
+        return self.visualizers[0].background_color()
+
+    def layers(self, width: int, height: int) -> list:
+        """Every visualizer's layers, bottom first."""
+        return [
+            layer
+            for visualizer in self.visualizers
+            for layer in visualizer.layers(width, height)
+        ]
+
+    def cache_params(self) -> dict:
+        """Parameters of every stacked visualizer."""
+        params = super().cache_params()
+        params["layers"] = [visualizer.cache_params() for visualizer in self.visualizers]
+        return params
+
+    def segment_curve(self, start: int, stop: int) -> np.ndarray:
+        """Bytes of every visualizer's curve rows for frames [start, stop)."""
+        return np.concatenate([
+            np.ascontiguousarray(visualizer.segment_curve(start, stop)).view(np.uint8).ravel()
+            for visualizer in self.visualizers
+        ])
+
+    def render_frame(self, frame_idx: int) -> np.ndarray:
+        """Composite every visualizer's layers for one frame."""
+        if self.stack is None:
+            width, height = self.frame_size
+            self.stack = LayerStack(width, height, [
+                SolidLayer(width, height, self.background_color()),
+                *self.layers(width, height),
+            ], alpha=self.output_format.alpha)
+        return self.stack.render(frame_idx)
@@ -0,0 +1,54 @@
+"""Render straight from in-memory audio and images to in-memory video."""
+
+import io
+
+
+def render_to_stream(
+    visualizer_class,
+    audio,
+    stream,
+    output_format: str = ".mp4",
+    pipelined: bool = True,
+    **kwargs
+) -> None:
+    """Render a visualization and write the encoded video to a writable.
+
+    Nothing touches the disk: samples, images and the encoded video travel
+    through pipes to and from ffmpeg.
+
+    Args:
+        visualizer_class: Visualizer to use (e.g. WaveformVisualizer)
+        audio: (samples, sample_rate) tuple, binary file-like object or path
+        stream: Binary writable that receives the encoded video
+        output_format: Output extension; must be a streamable format
+        pipelined: Encode while rendering instead of buffering every frame
+        **kwargs: Extra visualizer arguments (e.g. image_file, max_duration)
+    """
+    visualizer = visualizer_class(
+        audio, output_file=stream, output_format=output_format, **kwargs
+    )
+    visualizer.run(pipelined=pipelined)
+
+
+def render_to_bytes(
+    visualizer_class,
+    audio,
+    output_format: str = ".mp4",
+    pipelined: bool = True,
+    **kwargs
+) -> bytes:
+    """Render a visualization and return the encoded video.
+
+    Args:
+        visualizer_class: Visualizer to use (e.g. WaveformVisualizer)
+        audio: (samples, sample_rate) tuple, binary file-like object or path
+        output_format: Output extension; must be a streamable format
+        pipelined: Encode while rendering instead of buffering every frame
+        **kwargs: Extra visualizer arguments (e.g. image_file, max_duration)
+
+    Returns:
+        The encoded video
+    """
+    buffer = io.BytesIO()
+    render_to_stream(visualizer_class, audio, buffer, output_format, pipelined, **kwargs)
+    return buffer.getvalue()
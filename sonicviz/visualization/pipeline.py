@@ -0,0 +1,69 @@
+"""Overlapped rendering and encoding connected by a bounded queue."""
+
+import queue
+import threading
+from typing import Callable
+
+_DONE = object()
+
+
+class FramePipeline:
+    """Renders frames on the calling thread while another thread consumes them.
+
+    Frames travel through a bounded queue, so the renderer blocks once
+    ``queue_size`` frames are waiting and memory stays bounded no matter how
+    long the video is. The consumer is typically an encoder writing to an
+    ffmpeg process, which then encodes while the next frames are rendered.
+    """
+
+    def __init__(
+        self,
+        render: Callable,
+        frame_count: int,
+        consume: Callable,
+        queue_size: int = 32
+    ) -> None:
+        """Initialize the pipeline.
+
+        Args:
+            render: Called with a frame index, returns the frame
+            frame_count: Number of frames to render
+            consume: Called with each frame, in order
+            queue_size: Maximum number of frames waiting to be consumed
+        """
+        self.render = render
+        self.frame_count = frame_count
+        self.consume = consume
+        self.queue_size = queue_size
+
+    def run(self) -> None:
+        """Render and consume all frames, re-raising the first error."""
+        frames = queue.Queue(maxsize=self.queue_size)
+        errors = []
+
+        def consumer() -> None:
+            try:
+                while True:
+                    frame = frames.get()
+                    if frame is _DONE:
+                        return
+                    self.consume(frame)
+            except BaseException as e:
+                errors.append(e)
+                # Keep draining so the renderer never blocks on a full queue
+                while frames.get() is not _DONE:
+                    pass
+
+        thread = threading.Thread(target=consumer, daemon=True)
+        thread.start()
+        try:
+            for frame_idx in range(self.frame_count):
+                if errors:
+                    break
+                frames.put(self.render(frame_idx))
+        finally:
+            frames.put(_DONE)
+            thread.join()
+
+        if errors:
+            raise errors[0]
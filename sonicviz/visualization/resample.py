@@ -0,0 +1,98 @@
+"""Anti-aliased integer decimation of audio for analysis, block by block."""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Input samples per block when decimating arrays
+BLOCK_SIZE = 1 << 16
+# Filter taps per unit of decimation factor
+TAPS_PER_FACTOR = 20
+# Passband edge as a fraction of the decimated Nyquist frequency
+CUTOFF = 0.9
+
+
+def decimation_factor(sample_rate: int, analysis_rate: int, *lengths: int) -> int:
+    """Largest integer factor keeping the sample rate at or above analysis_rate.
+
+    The factor also divides every given length (window, hop), so they can
+    be rescaled exactly and the frame timing does not drift.
+
+    Args:
+        sample_rate: Native sample rate
+        analysis_rate: Lowest acceptable analysis rate (None for no decimation)
+        *lengths: Sample counts that must stay integers after decimation
+
+    Returns:
+        Decimation factor (1 for none)
+    """
+    if analysis_rate is None or analysis_rate >= sample_rate:
+        return 1
+    factor = int(sample_rate // analysis_rate)
+    while factor > 1 and any(length % factor for length in lengths):
+        factor -= 1
+    return factor
+
+
+def lowpass_taps(factor: int) -> np.ndarray:
+    """Blackman-windowed sinc low-pass filter for decimating by ``factor``.
+
+    The cutoff sits just below the decimated Nyquist frequency. The filter
+    has an odd length and is symmetric, so it does not shift the signal.
+    """
+    count = TAPS_PER_FACTOR * factor + 1
+    cutoff = CUTOFF * 0.5 / factor
+    n = np.arange(count) - (count - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.blackman(count)
+    return taps / taps.sum()
+
+
+def array_blocks(samples: np.ndarray, block_size: int = BLOCK_SIZE):
+    """Yield consecutive blocks of an array (views, not copies)."""
+    for start in range(0, len(samples), block_size):
+        yield samples[start:start + block_size]
+
+
+def decimate(blocks, factor: int):
+    """Low-pass filter and downsample a stream of mono sample blocks.
+
+    Only every ``factor``-th filtered sample is computed, and just enough
+    input is carried between blocks for the filter, so memory stays
+    proportional to the block size. Output sample ``j`` is the filtered
+    signal at input sample ``j * factor``; the signal is zero-padded at both
+    ends.
+
+    Args:
+        blocks: Iterable of 1-D sample arrays in order
+        factor: Decimation factor (1 passes the blocks through)
+
+    Yields:
+        Decimated 1-D float64 arrays
+    """
+    if factor == 1:
+        yield from blocks
+        return
+    taps = lowpass_taps(factor)
+    half = len(taps) // 2
+    buffer = np.zeros(half)
+    # Index of buffer[0] in the zero-padded input
+    start = 0
+
+    def flush(buffer: np.ndarray, start: int) -> tuple:
+        """Filter every complete window at a multiple of factor."""
+        first = -start % factor
+        count = len(buffer) - len(taps) + 1
+        if count <= first:
+            return None, buffer, start
+        windows = sliding_window_view(buffer, len(taps))[first:count:factor]
+        output = windows @ taps
+        consumed = first + len(output) * factor
+        return output, buffer[consumed:], start + consumed
+
+    for block in blocks:
+        buffer = np.concatenate([buffer, np.asarray(block, dtype=np.float64)])
+        output, buffer, start = flush(buffer, start)
+        if output is not None:
+            yield output
+    output, _, _ = flush(np.concatenate([buffer, np.zeros(half)]), start)
+    if output is not None:
+        yield output
@@ -0,0 +1,108 @@
+"""Local cache of encoded video segments for incremental re-renders."""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import numpy as np
+
+
+def segment_key(params: dict, curve: np.ndarray) -> str:
+    """Hash everything that determines the pixels of one encoded segment.
+
+    Args:
+        params: Visual parameters of the renderer (see cache_params)
+        curve: The motion curve rows rendered in the segment
+
+    Returns:
+        Hex digest identifying the segment
+    """
+    curve = np.ascontiguousarray(curve)
+    digest = hashlib.sha256()
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    digest.update(str(curve.dtype).encode())
+    digest.update(repr(curve.shape).encode())
+    digest.update(curve.tobytes())
+    return digest.hexdigest()
+
+
+class SegmentCache:
+    """Encoded segments stored as files named by their key.
+
+    Reading a segment refreshes its modification time, and evict() removes
+    the least recently used segments once the cache outgrows ``max_bytes``.
+    Files are moved into place atomically, so several processes can share
+    a cache directory.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 2 * 1024 ** 3) -> None:
+        """Initialize the cache.
+
+        Args:
+            directory: Folder holding the segments (created if missing)
+            max_bytes: Size above which least recently used segments are evicted
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def get(self, key: str, suffix: str) -> Path:
+        """Return the cached segment for a key, or None if it is missing."""
+        path = self.directory / f"{key}{suffix}"
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, suffix: str, write) -> Path:
+        """Create a segment by calling ``write(path)`` and store it.
+
+        Args:
+            key: Segment key
+            suffix: Extension of the segment file (selects its format)
+            write: Callable that writes the segment to the given path
+
+        Returns:
+            Path of the stored segment
+        """
+        path = self.directory / f"{key}{suffix}"
+        partial = self.directory / f".{key}.{os.getpid()}.partial{suffix}"
+        try:
+            write(partial)
+            os.replace(partial, path)
+        finally:
+            partial.unlink(missing_ok=True)
+        return path
+
+    def evict(self, keep: list = ()) -> int:
+        """Remove least recently used segments until the cache fits max_bytes.
+
+        Args:
+            keep: Segment paths that must not be removed (e.g. the ones the
+                  current render is using)
+
+        Returns:
+            Number of segments removed
+        """
+        keep = {Path(path).resolve() for path in keep}
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                total += stat.st_size
+                entries.append((stat.st_mtime_ns, stat.st_size, Path(entry.path)))
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path.resolve() in keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
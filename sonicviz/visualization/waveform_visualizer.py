@@ -1,103 +1,151 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import soundfile as sf
-from moviepy.video.io.ImageSequenceClip import ImageSequenceClip
+from PIL import Image
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from .base import BaseVisualizer
-import tempfile
-import os
+from .compositing import Layer, centered
+from .curves import waveform_windows
 
 
-class WaveformVisualizer(BaseVisualizer):
-    """Converts audio files to animated waveform visualizations."""
+class WaveformFigure:
+    """A waveform plot drawn once and updated by blitting the line only.
+
+    The figure, axes and background are set up once; each frame restores
+    the cached background and redraws just the waveform line.
+    """
+
+    DPI = 100
+
+    def __init__(self, width: int, height: int, history_length: int, facecolor='black') -> None:
+        """Initialize the figure.
+
+        Args:
+            width: Width in pixels
+            height: Height in pixels
+            history_length: Number of amplitudes shown
+            facecolor: Background color ('none' for transparent)
+        """
+        self.figure = Figure(figsize=(width / self.DPI, height / self.DPI), dpi=self.DPI)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.subplots()
+        (self.line,) = self.ax.plot(
+            np.arange(history_length), np.zeros(history_length),
+            color='white', linewidth=2, animated=True
+        )
+        self.ax.set_ylim(0, 1.1)
+        self.ax.set_xlim(0, history_length - 1)
+        self.ax.set_facecolor(facecolor)
+        self.figure.patch.set_facecolor(facecolor)
+        self.ax.axis('off')
+        self.figure.tight_layout(pad=0)
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+
+    def draw(self, amplitudes) -> np.ndarray:
+        """Draw one frame and return the canvas as an RGBA view.
+
+        The view is overwritten by the next call.
+        """
+        self.canvas.restore_region(self.background)
+        self.line.set_ydata(amplitudes)
+        self.ax.draw_artist(self.line)
+        return np.asarray(self.canvas.buffer_rgba())
+
 
-    def __init__(self, audio_file: str, output_file: str = "output.mp4", max_duration: float = None) -> None:
+class WaveformLayer(Layer):
+    """Dynamic layer drawing a visualizer's waveform on a transparent background."""
+
+    def __init__(self, visualizer, width: int, height: int) -> None:
+        """Initialize the layer.
+
+        Args:
+            visualizer: WaveformVisualizer providing the motion curve
+            width: Canvas width in pixels (the waveform spans all of it)
+            height: Canvas height in pixels
+        """
+        self.visualizer = visualizer
+        self.width = width
+        self.height = height
+        self.figure = WaveformFigure(
+            width, min(height, visualizer.HEIGHT), visualizer.history_length, 'none'
+        )
+
+    def render(self, frame_idx: int) -> tuple:
+        """Draw the waveform centered vertically on the canvas."""
+        pixels = self.figure.draw(self.visualizer.motion_curve[frame_idx])
+        image = Image.frombuffer(
+            'RGBA', (pixels.shape[1], pixels.shape[0]), pixels, 'raw', 'RGBA', 0, 1
+        )
+        return image, centered(self.width, self.height, image)
+
+
+class WaveformVisualizer(BaseVisualizer):
+    """Converts audio files to animated waveform visualizations.
+
+    The white line on black has no color, so frames are rendered as one
+    gray channel, a third of the size of RGB frames.
+    """
+
+    WIDTH = 1500
+    HEIGHT = 100
+    PIXEL_FORMAT = "gray"
+
+    def __init__(
+        self,
+        audio_file,
+        output_file="output.mp4",
+        max_duration: float = None,
+        output_format: str = None,
+        analysis_rate: int = None
+    ) -> None:
         """Initialize the visualizer with input and output paths.
 
         Args:
-            audio_file: Path to the input audio file
-            output_file: Path for the output video file
+            audio_file: Path to the input audio file, a binary file-like object
+                        or a (samples, sample_rate) tuple
+            output_file: Path for the output video file, or a binary writable
             max_duration: Maximum duration in seconds to process (None for full duration)
+            output_format: Output extension such as ".webm" (defaults to the
+                           output file's extension)
+            analysis_rate: Analyze the audio at no less than this sample rate
+                           (None for the native rate)
         """
-        super().__init__(audio_file, output_file, max_duration)
+        super().__init__(
+            audio_file, output_file, max_duration, output_format, analysis_rate
+        )
         self.history_length = 60
+        self.figure = None
 
     def generate_frame(self, current_amplitudes: list) -> np.ndarray:
         """Generate a single frame from amplitude data.
 
+        The figure is created on the first call and reused afterwards.
+
         Args:
             current_amplitudes: List of amplitude values to visualize
 
         Returns:
             Numpy array representing the frame
         """
-        fig, ax = plt.subplots(figsize=(15, 1), dpi=100)
-        x = np.arange(len(current_amplitudes))
-        ax.plot(x, current_amplitudes, color='white', linewidth=2)
-
-        ax.set_ylim(0, 1.1)
-        ax.set_xlim(0, self.history_length - 1)
-        ax.set_facecolor('black')
-        fig.patch.set_facecolor('black')
-        ax.axis('off')
-        fig.tight_layout(pad=0)
-        fig.canvas.draw()
-
-        width, height = fig.canvas.get_width_height()
-        frame = np.frombuffer(fig.canvas.tostring_argb(), dtype=np.uint8)
-        frame = frame.reshape((height, width, 4))[:, :, 1:]  # Skip alpha channel
-        plt.close(fig)
-
-        return frame
-
-    def generate_frames(self) -> None:
-        """Generate all frames for the visualization."""
-        print("Generating frames...")
-        for frame_idx in range(len(self.amplitude_history)):
-            start_idx = max(0, frame_idx - self.history_length)
-            current_amplitudes = list(
-                self.amplitude_history[start_idx:frame_idx + 1]
-            )
-
-            if len(current_amplitudes) < self.history_length:
-                padding = [0] * (self.history_length - len(current_amplitudes))
-                current_amplitudes = padding + current_amplitudes
-
-            frame = self.generate_frame(current_amplitudes)
-            self.frames.append(frame)
-
-    def create_video(self) -> None:
-        """Create the output video file."""
-        print("Creating video...")
-        fps = self.sr / self.hop_length
-        clip = ImageSequenceClip(self.frames, fps=fps)
-
-        # If max_duration was specified, save trimmed audio to temporary file
-        audio_file_to_use = self.audio_file
-        temp_audio = None
-
-        if self.max_duration is not None:
-            # Create temporary audio file with trimmed content
-            temp_fd, temp_audio = tempfile.mkstemp(suffix='.wav')
-            os.close(temp_fd)
-            try:
-                sf.write(temp_audio, self.y, self.sr)
-                audio_file_to_use = temp_audio
-            except Exception as e:
-                print(f"Warning: Could not write temp audio file: {e}")
-                audio_file_to_use = self.audio_file
-
-        try:
-            clip.write_videofile(
-                self.output_file,
-                audio=audio_file_to_use,
-                codec='libx264',
-                audio_codec='aac'
-            )
-            print("Done!")
-        finally:
-            # Clean up temporary file if created
-            if temp_audio and os.path.exists(temp_audio):
-                try:
-                    os.remove(temp_audio)
-                except OSError:
-                    pass
+        if self.figure is None:
+            self.figure = WaveformFigure(self.WIDTH, self.HEIGHT, self.history_length)
+        return self.figure.draw(current_amplitudes)[:, :, :3].copy()
+
+    def compute_motion_curve(self) -> np.ndarray:
+        """Precompute the amplitude window shown in every frame."""
+        return waveform_windows(self.amplitude_history, self.history_length)
+
+    @property
+    def frame_size(self) -> tuple:
+        """(width, height) of a rendered frame."""
+        return self.WIDTH, self.HEIGHT
+
+    def layers(self, width: int, height: int) -> list:
+        """Draw the waveform line over whatever is below it."""
+        return [WaveformLayer(self, width, height)]
+
+    def render_frame(self, frame_idx: int) -> np.ndarray:
+        """Render the (H, W) gray frame showing the amplitude history up to frame_idx."""
+        if self.figure is None:
+            self.figure = WaveformFigure(self.WIDTH, self.HEIGHT, self.history_length)
+        return self.figure.draw(self.motion_curve[frame_idx])[:, :, 0].copy()
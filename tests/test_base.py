@@ -7,6 +7,10 @@ from sonicviz.visualization.base import BaseVisualizer
 class ConcreteVisualizer(BaseVisualizer):
     """Concrete implementation of BaseVisualizer for testing."""
 
+    def render_frame(self, frame_idx):
+        """Stub implementation."""
+        return np.zeros((100, 100, 3), dtype=np.uint8)
+
     def generate_frames(self):
         """Stub implementation."""
         self.frames = [np.zeros((100, 100, 3), dtype=np.uint8)]
@@ -1,5 +1,6 @@
 """Tests for CLI module."""
 
+import pytest
 from sonicviz import cli
 
 
@@ -22,3 +23,43 @@ def test_cli_with_help(monkeypatch, capsys):
     captured = capsys.readouterr()
     assert 'type' in captured.out or 'Type' in captured.out
     assert 'input' in captured.out or 'Input' in captured.out
+
+
+def test_enqueue_persists_index(tmp_path):
+    """Test that enqueue scans through a persisted index."""
+    input_folder = tmp_path / "input"
+    input_folder.mkdir()
+    (input_folder / "song.wav").write_bytes(b"x")
+    index_file = tmp_path / "index.json"
+
+    app = cli.VisualizerApp()
+    app.run([
+        "enqueue", str(input_folder), "--queue", str(tmp_path / "jobs.db"),
+        "--index", str(index_file)
+    ])
+
+    assert index_file.exists()
+
+
+def test_watch_once_renders_folder(tmp_path, temp_audio_file):
+    """Test that watch --once renders the folder's files and exits."""
+    input_folder = tmp_path / "input"
+    input_folder.mkdir()
+    (input_folder / "song.wav").write_bytes(open(temp_audio_file, "rb").read())
+    output_folder = tmp_path / "output"
+
+    app = cli.VisualizerApp()
+    app.run([
+        "watch", str(input_folder), "-o", str(output_folder), "-d", "0.3",
+        "--interval", "0.01", "--once"
+    ])
+
+    assert (output_folder / "song.mp4").exists()
+
+
+def test_non_positive_analysis_rate_is_rejected(capsys):
+    """Test that the CLI rejects a zero analysis rate before rendering."""
+    app = cli.VisualizerApp()
+    with pytest.raises(SystemExit):
+        app.run(["song.wav", "--analysis-rate", "0"])
+    assert "must be positive" in capsys.readouterr().err
@@ -0,0 +1,91 @@
+"""Tests for layer compositing and stacked visualizers."""
+
+import imageio_ffmpeg
+import numpy as np
+from PIL import Image
+from sonicviz.visualization import (
+    ImageAnimatorVisualizer, Layer, LayerStack, LayeredVisualizer, SolidLayer,
+    WaveformVisualizer
+)
+
+
+class CountingLayer(Layer):
+    """Layer drawing a half-transparent white square, counting its renders."""
+
+    def __init__(self, static):
+        self.static = static
+        self.renders = 0
+
+    def render(self, frame_idx):
+        self.renders += 1
+        return Image.new("RGBA", (2, 2), (255, 255, 255, 128)), (1, 1)
+
+
+def test_static_layers_render_once():
+    """Test that static layers are rasterized once and dynamic ones per frame."""
+    static, dynamic = CountingLayer(True), CountingLayer(False)
+    stack = LayerStack(4, 4, [SolidLayer(4, 4, (0, 0, 0)), static, dynamic])
+
+    for frame_idx in range(5):
+        frame = stack.render(frame_idx)
+
+    assert static.renders == 1
+    assert dynamic.renders == 5
+    assert frame.shape == (4, 4, 3)
+    assert tuple(frame[0, 0]) == (0, 0, 0)
+    # two half-transparent white layers over black
+    assert tuple(frame[1, 1]) == (192, 192, 192)
+
+
+def test_frames_do_not_share_the_buffer():
+    """Test that each rendered frame is an independent, writable array."""
+    stack = LayerStack(4, 4, [SolidLayer(4, 4, (0, 0, 0)), CountingLayer(False)])
+
+    first = stack.render(0)
+    second = stack.render(1)
+    first[:] = 7
+
+    assert first.flags.writeable
+    assert tuple(second[0, 0]) == (0, 0, 0)
+
+
+def test_transparent_stack_keeps_alpha():
+    """Test that alpha stacks composite over transparency and return RGBA."""
+    stack = LayerStack(4, 4, [SolidLayer(4, 4, (0, 0, 0, 0)), CountingLayer(False)], alpha=True)
+
+    frame = stack.render(0)
+
+    assert frame.shape == (4, 4, 4)
+    assert tuple(frame[0, 0]) == (0, 0, 0, 0)
+    assert tuple(frame[1, 1]) == (255, 255, 255, 128)
+
+
+def test_waveform_figure_is_reused(temp_audio_file, temp_output_file):
+    """Test that redrawing the reused figure does not leave earlier lines behind."""
+    viz = WaveformVisualizer(temp_audio_file, temp_output_file)
+    amplitudes = [0.5 * abs(np.sin(i / 10)) for i in range(60)]
+
+    first = viz.generate_frame(amplitudes)
+    viz.generate_frame([1.0] * 60)
+    again = viz.generate_frame(amplitudes)
+
+    assert np.array_equal(first, again)
+    assert first.shape == (100, 1500, 3)
+
+
+def test_layered_waveform_over_image(temp_audio_file, temp_image_file, tmp_path):
+    """Test stacking a waveform over an animated image in one render."""
+    output_file = tmp_path / "out.mp4"
+    image = ImageAnimatorVisualizer(temp_audio_file, temp_image_file)
+    viz = LayeredVisualizer(
+        temp_audio_file, [image, WaveformVisualizer(temp_audio_file)],
+        str(output_file), max_duration=0.5
+    )
+    viz.run()
+
+    assert viz.frames[0].shape == (100, 100, 3)
+    assert len(viz.frames) == len(viz.amplitude_history)
+    alone = image.render_frame(len(viz.frames) - 1)
+    assert not np.array_equal(viz.frames[-1], alone)
+    frames, _ = imageio_ffmpeg.count_frames_and_secs(str(output_file))
+    assert frames == len(viz.frames)
@@ -0,0 +1,63 @@
+"""Tests for precomputed motion curves."""
+
+import numpy as np
+import pytest
+from sonicviz.visualization import (
+    ImageAnimatorVisualizer, WaveformVisualizer,
+    image_curve, load_curve, save_curve, waveform_windows,
+)
+
+
+def test_waveform_windows_pad_and_slide():
+    """Test that each window ends at its frame and is zero-padded at the start."""
+    amplitudes = np.arange(1, 11, dtype=float)
+    windows = waveform_windows(amplitudes, 4)
+
+    assert windows.shape == (10, 4)
+    np.testing.assert_array_equal(windows[0], [0, 0, 0, 1])
+    np.testing.assert_array_equal(windows[2], [0, 1, 2, 3])
+    np.testing.assert_array_equal(windows[9], [7, 8, 9, 10])
+
+
+def test_image_curve_matches_piecewise_map():
+    """Test scale and saturation against the scalar formulas."""
+    c = ImageAnimatorVisualizer
+    intensity = np.array([0.0, 0.04, 0.05, 0.5, 1.0])
+    curve = image_curve(
+        intensity, c.MIN_SCALE, c.MAX_SCALE,
+        c.MIN_SATURATION, c.MAX_SATURATION, c.INTENSITY_THRESHOLD
+    )
+
+    np.testing.assert_allclose(curve["scale"], 0.8 + 0.4 * intensity)
+    assert curve["saturation"][0] == 0.0
+    assert curve["saturation"][1] == 0.0
+    assert curve["saturation"][2] == pytest.approx(0.0)
+    assert curve["saturation"][3] == pytest.approx(2.0 * 0.45 / 0.95)
+    assert curve["saturation"][4] == pytest.approx(2.0)
+
+
+def test_curve_round_trip(tmp_path):
+    """Test that structured curves survive saving and loading."""
+    curve = image_curve(np.linspace(0, 1, 20), 0.8, 1.2, 0.0, 2.0, 0.05)
+    save_curve(tmp_path / "curve.npy", curve)
+    loaded = load_curve(tmp_path / "curve.npy")
+
+    assert loaded.dtype == curve.dtype
+    np.testing.assert_array_equal(loaded, curve)
+
+
+def test_visualizers_precompute_curves(temp_audio_file, temp_image_file, temp_output_file):
+    """Test that computing the envelope also computes the motion curve."""
+    waveform = WaveformVisualizer(temp_audio_file, temp_output_file, max_duration=0.3)
+    waveform.load_audio()
+    waveform.compute_amplitude_history()
+    assert waveform.motion_curve.shape == (len(waveform.amplitude_history), 60)
+
+    image = ImageAnimatorVisualizer(
+        temp_audio_file, image_file=temp_image_file,
+        output_file=temp_output_file, max_duration=0.3
+    )
+    image.load_audio()
+    image.compute_amplitude_history()
+    assert len(image.motion_curve) == len(image.amplitude_history)
+    assert set(image.motion_curve.dtype.names) == {"intensity", "scale", "saturation"}
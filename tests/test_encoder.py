@@ -0,0 +1,88 @@
+"""Tests for the streaming ffmpeg encoder."""
+
+import imageio_ffmpeg
+import numpy as np
+import pytest
+from sonicviz.visualization.encoder import FFmpegWriter, encode_segments, segment_bounds
+
+
+def test_writer_encodes_frames(tmp_path):
+    """Test that written frames end up in the output video."""
+    output_file = tmp_path / "out.mp4"
+    writer = FFmpegWriter(str(output_file), fps=25)
+    for value in range(0, 250, 10):
+        writer.write_frame(np.full((32, 48, 3), value, dtype=np.uint8))
+    writer.close()
+
+    frames, _ = imageio_ffmpeg.count_frames_and_secs(str(output_file))
+    assert frames == 25
+
+
+def test_writer_muxes_trimmed_audio(tmp_path, temp_audio_file):
+    """Test that audio is muxed and trimmed to audio_duration."""
+    output_file = tmp_path / "out.mp4"
+    writer = FFmpegWriter(
+        str(output_file), fps=10, audio_file=temp_audio_file, audio_duration=0.5
+    )
+    for _ in range(5):
+        writer.write_frame(np.zeros((16, 16, 3), dtype=np.uint8))
+    writer.close()
+
+    reader = imageio_ffmpeg.read_frames(str(output_file))
+    meta = next(reader)
+    reader.close()
+    assert meta["audio_codec"] == "aac"
+    assert meta["duration"] == pytest.approx(0.5, abs=0.1)
+
+
+def test_close_without_frames(tmp_path):
+    """Test that closing an empty writer is an error."""
+    with pytest.raises(ValueError):
+        FFmpegWriter(str(tmp_path / "out.mp4"), fps=25).close()
+
+
+def test_segment_bounds_are_gop_aligned():
+    """Test that segments start on keyframe boundaries and cover every frame."""
+    bounds = segment_bounds(100, 3, 10)
+
+    assert bounds == [(0, 40), (40, 80), (80, 100)]
+    assert segment_bounds(5, 4, 10) == [(0, 5)]
+
+
+def test_encode_segments_joins_in_order(tmp_path, temp_audio_file):
+    """Test that parallel segments join into one video with audio, in order."""
+    output_file = tmp_path / "out.mp4"
+    frames = [np.full((32, 32, 3), value, dtype=np.uint8) for value in range(0, 240, 6)]
+
+    encode_segments(frames, str(output_file), 25, workers=3, audio_file=temp_audio_file)
+
+    reader = imageio_ffmpeg.read_frames(str(output_file))
+    meta = next(reader)
+    decoded = [np.frombuffer(frame, dtype=np.uint8).mean() for frame in reader]
+    assert meta["audio_codec"] == "aac"
+    assert len(decoded) == len(frames)
+    assert decoded == sorted(decoded)
+    assert [path.name for path in tmp_path.iterdir()] == ["out.mp4"]
+
+
+@pytest.mark.parametrize("pixel_format, shape", [
+    ("gray", (32, 48)),
+    ("yuv420p", (48, 48)),
+])
+def test_writer_accepts_native_pixel_formats(tmp_path, pixel_format, shape):
+    """Test that gray and planar yuv420p frames are encoded without conversion."""
+    output_file = tmp_path / "out.mp4"
+    writer = FFmpegWriter(str(output_file), fps=25, pixel_format=pixel_format)
+    for _ in range(10):
+        frame = np.full(shape, 128, dtype=np.uint8)
+        frame[:16] = 200
+        writer.write_frame(frame)
+    writer.close()
+
+    reader = imageio_ffmpeg.read_frames(str(output_file))
+    meta = next(reader)
+    decoded = [np.frombuffer(frame, dtype=np.uint8) for frame in reader]
+    assert meta["size"] == (48, 32)
+    assert len(decoded) == 10
+    top = decoded[0].reshape(32, 48, 3)[:8].mean()
+    assert top > decoded[0].reshape(32, 48, 3)[24:].mean()
@@ -0,0 +1,79 @@
+"""Tests for the output format registry."""
+
+import numpy as np
+import pytest
+from PIL import Image
+from sonicviz.processing import BatchProcessor
+from sonicviz.visualization.encoder import create_writer, FFmpegWriter, ImageSequenceWriter
+from sonicviz.visualization.formats import get_output_format
+from sonicviz.visualization.image_animator import ImageAnimatorVisualizer
+
+
+def test_format_lookup_by_extension():
+    """Test that formats are chosen by (case-insensitive) extension."""
+    assert get_output_format("clip.MP4").name == "MP4/H.264"
+    assert get_output_format("clip.webm").alpha
+    assert get_output_format("clip.gif").palette
+    assert get_output_format("clip.png").sequence
+
+
+def test_unknown_format_is_rejected():
+    """Test that unknown extensions fail early."""
+    with pytest.raises(ValueError, match="Unknown output format"):
+        get_output_format("clip.avi")
+    with pytest.raises(ValueError):
+        BatchProcessor(output_format=".avi")
+
+
+def test_gif_palette_is_built_in_one_pass(tmp_path):
+    """Test that GIF output uses a single palettegen/paletteuse pass."""
+    writer = create_writer(str(tmp_path / "clip.gif"), fps=86, audio_file="song.wav")
+    command = writer._command(32, 32, "rgba")
+
+    graph = command[command.index("-filter_complex") + 1]
+    assert "fps=50" in graph
+    assert "palettegen" in graph and "paletteuse" in graph
+    assert "song.wav" not in command
+
+
+@pytest.mark.parametrize("extension", [".webm", ".gif", ".apng"])
+def test_rgba_frames_encode(tmp_path, extension):
+    """Test that RGBA frames are encoded natively for alpha formats."""
+    output_file = tmp_path / f"clip{extension}"
+    writer = create_writer(str(output_file), fps=10)
+    assert isinstance(writer, FFmpegWriter)
+    for value in range(0, 250, 50):
+        frame = np.zeros((24, 24, 4), dtype=np.uint8)
+        frame[4:20, 4:20] = (value, 0, 255 - value, 255)
+        writer.write_frame(frame)
+    writer.close()
+
+    assert output_file.stat().st_size > 0
+
+
+def test_png_sequence_keeps_alpha(tmp_path):
+    """Test that PNG sequences are written as numbered RGBA files."""
+    writer = create_writer(str(tmp_path / "clip.png"), fps=10)
+    assert isinstance(writer, ImageSequenceWriter)
+    for _ in range(3):
+        writer.write_frame(np.zeros((8, 8, 4), dtype=np.uint8))
+    writer.close()
+
+    files = sorted((tmp_path / "clip").iterdir())
+    assert [f.name for f in files] == ["000000.png", "000001.png", "000002.png"]
+    assert Image.open(files[0]).mode == "RGBA"
+
+
+def test_image_animator_transparent_canvas(temp_audio_file, temp_image_file, tmp_path):
+    """Test that alpha formats replace the magenta background with transparency."""
+    viz = ImageAnimatorVisualizer(
+        temp_audio_file, image_file=temp_image_file,
+        output_file=str(tmp_path / "clip.webm")
+    )
+    viz._load_image()
+    small = viz.base_image.resize((50, 50))
+    framed = np.array(viz._center_on_canvas(small))
+
+    assert framed.shape == (100, 100, 4)
+    assert framed[0, 0, 3] == 0
+    assert framed[50, 50, 3] == 255
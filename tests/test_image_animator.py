@@ -1,5 +1,6 @@
 """Tests for image animator visualizer."""
 
+import imageio_ffmpeg
 from sonicviz.visualization.image_animator import ImageAnimatorVisualizer
 
 
@@ -85,3 +86,21 @@ def test_image_animator_frame_generation(temp_audio_file, temp_image_file, temp_
         first_frame = viz.frames[0]
         for frame in viz.frames[1:]:
             assert frame.shape == first_frame.shape
+
+
+def test_image_animator_parallel_segment_encoding(temp_audio_file, temp_image_file, tmp_path):
+    """Test that segment-parallel encoding keeps every frame and the audio."""
+    output_file = tmp_path / "out.mp4"
+    viz = ImageAnimatorVisualizer(
+        temp_audio_file,
+        image_file=temp_image_file,
+        output_file=str(output_file)
+    )
+    viz.run(encoder_jobs=3)
+
+    frames, _ = imageio_ffmpeg.count_frames_and_secs(str(output_file))
+    assert frames == len(viz.frames)
+    reader = imageio_ffmpeg.read_frames(str(output_file))
+    meta = next(reader)
+    reader.close()
+    assert meta["audio_codec"] == "aac"
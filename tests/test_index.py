@@ -0,0 +1,91 @@
+"""Tests for the audio/image folder index."""
+
+import os
+import pytest
+from sonicviz.processing import BatchProcessor
+from sonicviz.processing.index import AudioIndex
+
+AUDIO_EXTENSIONS = BatchProcessor.AUDIO_EXTENSIONS
+
+
+@pytest.fixture
+def music_folder(tmp_path):
+    """Create a small tree of audio files, images and unrelated files."""
+    root = tmp_path / "music"
+    (root / "album" / "disc2").mkdir(parents=True)
+    for name in ["a.wav", "a.png", "notes.txt", "album/b.MP3", "album/b.png",
+                 "album/disc2/c.flac"]:
+        (root / name).write_bytes(b"x")
+    return root
+
+
+def test_scan_finds_audio_recursively(music_folder):
+    """Test that audio files are found in nested folders and sorted."""
+    index = AudioIndex.scan(music_folder, AUDIO_EXTENSIONS)
+
+    assert index.audio_files() == [
+        music_folder / "a.wav",
+        music_folder / "album" / "b.MP3",
+        music_folder / "album" / "disc2" / "c.flac",
+    ]
+    assert index.stat(music_folder / "a.wav")[0] == 1
+    assert index.stat(music_folder / "notes.txt") is None
+
+
+def test_pairs_and_validation(music_folder):
+    """Test that images are paired by name and all missing ones are reported."""
+    index = AudioIndex.scan(music_folder, AUDIO_EXTENSIONS)
+    pairs = dict(index.pairs())
+
+    assert pairs[music_folder / "a.wav"] == music_folder / "a.png"
+    assert pairs[music_folder / "album" / "b.MP3"] == music_folder / "album" / "b.png"
+    assert pairs[music_folder / "album" / "disc2" / "c.flac"] is None
+
+    with pytest.raises(FileNotFoundError, match="1 audio file"):
+        index.validate_pairs()
+
+
+def test_saved_index_reuses_unchanged_directories(music_folder, tmp_path, monkeypatch):
+    """Test that a persisted index only relists directories that changed."""
+    index_file = tmp_path / "index.json"
+    AudioIndex.scan(music_folder, AUDIO_EXTENSIONS).save(index_file)
+    previous = AudioIndex.load(index_file)
+
+    (music_folder / "album" / "d.ogg").write_bytes(b"x")
+    listed = []
+    real_scandir = os.scandir
+
+    def counting_scandir(path):
+        listed.append(os.path.relpath(path, music_folder))
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+    index = AudioIndex.scan(music_folder, AUDIO_EXTENSIONS, previous)
+
+    assert listed == ["album"]
+    assert music_folder / "album" / "d.ogg" in index.audio_files()
+    assert len(index.audio_files()) == 4
+
+
+def test_load_missing_index(tmp_path):
+    """Test that loading a missing index returns None."""
+    assert AudioIndex.load(tmp_path / "missing.json") is None
+
+
+def test_image_batch_fails_before_rendering(music_folder, tmp_path):
+    """Test that an image batch with a missing image fails up front."""
+    processor = BatchProcessor("image")
+
+    with pytest.raises(SystemExit):
+        processor.process_folder(music_folder, tmp_path / "out")
+    assert not any((tmp_path / "out").iterdir())
+
+
+def test_stat_reads_files_on_demand(music_folder):
+    """Test that stat reflects a file rewritten in place after the scan."""
+    index = AudioIndex.scan(music_folder, AUDIO_EXTENSIONS)
+    (music_folder / "a.wav").write_bytes(b"xyz")
+
+    assert index.stat(music_folder / "a.wav")[0] == 3
+    (music_folder / "a.wav").unlink()
+    assert index.stat(music_folder / "a.wav") is None
@@ -0,0 +1,153 @@
+"""Tests for the SQLite job queue."""
+
+import multiprocessing
+import time
+from pathlib import Path
+from sonicviz.processing import BatchProcessor, JobQueue, QueueWorker
+
+
+def _drain(db_path, worker_id, results):
+    """Claim jobs until the queue is empty, recording their ids."""
+    queue = JobQueue(db_path)
+    while True:
+        job = queue.claim(worker_id)
+        if job is None:
+            return
+        results.put(job.id)
+        queue.complete(job.id, worker_id)
+
+
+def test_enqueue_and_claim(tmp_path):
+    """Test that jobs are claimed in order with their parameters."""
+    queue = JobQueue(tmp_path / "jobs.db")
+    first = queue.enqueue("a.wav", "a.mp4", "waveform", {"max_duration": 1.0})
+    queue.enqueue("b.wav", "b.mp4", "image")
+
+    job = queue.claim("w1")
+    assert job.id == first
+    assert job.visualizer_type == "waveform"
+    assert job.params == {"max_duration": 1.0}
+    assert job.attempts == 1
+    assert queue.counts() == {"running": 1, "pending": 1}
+
+
+def test_complete_requires_ownership(tmp_path):
+    """Test that only the lease holder can complete a job."""
+    queue = JobQueue(tmp_path / "jobs.db")
+    queue.enqueue("a.wav", "a.mp4")
+    job = queue.claim("w1")
+
+    assert not queue.complete(job.id, "w2")
+    assert queue.complete(job.id, "w1")
+    assert queue.claim("w1") is None
+    assert queue.counts() == {"done": 1}
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    """Test that a job whose worker stopped heartbeating is claimed again."""
+    queue = JobQueue(tmp_path / "jobs.db", lease_seconds=0.05)
+    queue.enqueue("a.wav", "a.mp4")
+    job = queue.claim("w1")
+    assert queue.claim("w2") is None
+
+    time.sleep(0.1)
+    reclaimed = queue.claim("w2")
+    assert reclaimed.id == job.id
+    assert reclaimed.attempts == 2
+    assert not queue.heartbeat(job.id, "w1")
+    assert queue.heartbeat(job.id, "w2")
+
+
+def test_failed_job_retries_then_fails(tmp_path):
+    """Test that failures requeue a job until max_attempts is reached."""
+    queue = JobQueue(tmp_path / "jobs.db", max_attempts=2)
+    queue.enqueue("a.wav", "a.mp4")
+
+    job = queue.claim("w1")
+    queue.fail(job.id, "w1", "boom")
+    assert queue.counts() == {"pending": 1}
+
+    job = queue.claim("w1")
+    queue.fail(job.id, "w1", "boom")
+    assert queue.counts() == {"failed": 1}
+    assert queue.claim("w1") is None
+
+
+def test_concurrent_workers_claim_each_job_once(tmp_path):
+    """Test that several worker processes never claim the same job."""
+    db_path = str(tmp_path / "jobs.db")
+    queue = JobQueue(db_path)
+    for i in range(40):
+        queue.enqueue(f"{i}.wav", f"{i}.mp4")
+
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=_drain, args=(db_path, f"w{i}", results))
+        for i in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    claimed = [results.get() for _ in range(40)]
+    assert sorted(claimed) == list(range(1, 41))
+    assert queue.counts() == {"done": 40}
+
+
+def test_worker_renders_enqueued_folder(tmp_path, temp_audio_file):
+    """Test enqueueing a folder and rendering it with a worker."""
+    input_folder = tmp_path / "input"
+    input_folder.mkdir()
+    Path(temp_audio_file).rename(input_folder / "song.wav")
+    Path(temp_audio_file).touch()
+    output_folder = tmp_path / "output"
+
+    queue = JobQueue(tmp_path / "jobs.db")
+    processor = BatchProcessor("waveform", max_duration=0.2)
+    assert processor.enqueue_folder(input_folder, queue, output_folder) == 1
+
+    worker = QueueWorker(queue, worker_id="w1")
+    assert worker.run(exit_when_empty=True) == 1
+    assert queue.counts() == {"done": 1}
+    assert (output_folder / "song.mp4").stat().st_size > 0
+
+
+def test_worker_renders_png_sequence(tmp_path, temp_audio_file):
+    """Test that a PNG sequence job moves its frame folder into place."""
+    input_folder = tmp_path / "input"
+    input_folder.mkdir()
+    Path(temp_audio_file).rename(input_folder / "song.wav")
+    Path(temp_audio_file).touch()
+    output_folder = tmp_path / "output"
+
+    queue = JobQueue(tmp_path / "jobs.db")
+    processor = BatchProcessor("waveform", max_duration=0.2, output_format=".png")
+    processor.enqueue_folder(input_folder, queue, output_folder)
+
+    worker = QueueWorker(queue, worker_id="w1")
+    assert worker.run(exit_when_empty=True) == 1
+    assert queue.counts() == {"done": 1}
+    assert [path.name for path in output_folder.iterdir()] == ["song"]
+    assert (output_folder / "song" / "000000.png").exists()
+
+
+def test_worker_discards_render_after_losing_lease(tmp_path, monkeypatch):
+    """Test that a worker whose lease was taken over never writes the output."""
+    output_file = tmp_path / "out.mp4"
+    queue = JobQueue(tmp_path / "jobs.db", lease_seconds=0.05)
+    queue.enqueue("a.wav", output_file)
+    job = queue.claim("w1")
+
+    def slow_render(self, audio_file, output_file, image_file=None):
+        time.sleep(0.1)
+        assert queue.claim("w2").id == job.id
+        Path(output_file).write_bytes(b"video")
+
+    monkeypatch.setattr(BatchProcessor, "render_file", slow_render)
+    worker = QueueWorker(queue, worker_id="w1", heartbeat_interval=10)
+
+    assert not worker.process(job)
+    assert not output_file.exists()
+    assert list(tmp_path.glob(".*.partial*")) == []
+    assert queue.counts() == {"running": 1}
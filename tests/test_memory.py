@@ -0,0 +1,108 @@
+"""Tests for rendering from and to memory."""
+
+import io
+import subprocess
+import imageio_ffmpeg
+import numpy as np
+import pytest
+import soundfile as sf
+from PIL import Image
+from sonicviz import ImageAnimatorVisualizer, WaveformVisualizer, render_to_bytes
+
+
+def _probe(data, tmp_path, suffix=".mp4"):
+    """Write video bytes to disk and return (frame_count, metadata)."""
+    path = tmp_path / f"probe{suffix}"
+    path.write_bytes(data)
+    frames, _ = imageio_ffmpeg.count_frames_and_secs(str(path))
+    reader = imageio_ffmpeg.read_frames(str(path))
+    meta = next(reader)
+    reader.close()
+    return frames, meta
+
+
+def _stereo_tone(sr=22050, seconds=0.5):
+    """Return a stereo sine as a (samples, 2) float array."""
+    t = np.arange(int(sr * seconds)) / sr
+    tone = 0.3 * np.sin(2 * np.pi * 440 * t)
+    return np.stack([tone, tone * 0.5], axis=1)
+
+
+def test_waveform_from_samples_to_bytes(tmp_path, monkeypatch):
+    """Test rendering PCM samples to MP4 bytes without temp files."""
+    samples = _stereo_tone()
+    monkeypatch.setattr("tempfile.mkstemp", None)
+
+    data = render_to_bytes(WaveformVisualizer, (samples, 22050))
+
+    frames, meta = _probe(data, tmp_path)
+    assert frames > 0
+    assert meta["audio_codec"] == "aac"
+
+
+def test_integer_pcm_is_scaled(tmp_path):
+    """Test that int16 samples are muxed and analyzed at their real level."""
+    samples = _stereo_tone()
+    pcm = np.round(samples * 32767).astype(np.int16)
+
+    data = render_to_bytes(WaveformVisualizer, (pcm, 22050))
+
+    video_file = tmp_path / "probe.mp4"
+    video_file.write_bytes(data)
+    audio_file = tmp_path / "audio.wav"
+    subprocess.run(
+        [imageio_ffmpeg.get_ffmpeg_exe(), "-loglevel", "error", "-i", str(video_file),
+         str(audio_file)],
+        check=True
+    )
+    decoded, _ = sf.read(str(audio_file))
+    assert np.abs(decoded).max() == pytest.approx(0.3, abs=0.05)
+
+    reference = WaveformVisualizer((samples, 22050))
+    scaled = WaveformVisualizer((pcm, 22050))
+    for viz in (reference, scaled):
+        viz.load_audio()
+        viz.compute_amplitude_history()
+    assert np.allclose(scaled.amplitude_history, reference.amplitude_history, atol=1e-3)
+
+
+def test_image_from_file_like_and_pil_image(tmp_path):
+    """Test a file-like audio input with a PIL image to a WebM writable."""
+    audio = io.BytesIO()
+    sf.write(audio, _stereo_tone(), 22050, format="WAV")
+    audio.seek(0)
+    image = Image.new("RGBA", (40, 30), (200, 20, 20, 255))
+    output = io.BytesIO()
+
+    viz = ImageAnimatorVisualizer(
+        audio, image_file=image, output_file=output, output_format=".webm"
+    )
+    viz.run(pipelined=True)
+
+    frames, meta = _probe(output.getvalue(), tmp_path, ".webm")
+    assert frames == len(viz.amplitude_history)
+    assert meta["size"] == (40, 30)
+
+
+def test_image_from_array_buffered():
+    """Test an ndarray image with buffered rendering to GIF bytes."""
+    image = np.zeros((20, 20, 3), dtype=np.uint8)
+    data = render_to_bytes(
+        ImageAnimatorVisualizer, (_stereo_tone()[:, 0], 22050),
+        output_format=".gif", pipelined=False, image_file=image
+    )
+    assert data[:6] == b"GIF89a"
+
+
+def test_stream_output_rejects_png_sequence():
+    """Test that formats which cannot be streamed fail clearly."""
+    with pytest.raises(ValueError, match="cannot be written to a stream"):
+        render_to_bytes(
+            WaveformVisualizer, (_stereo_tone(), 22050), output_format=".png"
+        )
+
+
+def test_image_required_for_in_memory_audio():
+    """Test that in-memory audio cannot fall back to a sibling PNG."""
+    with pytest.raises(ValueError, match="image_file is required"):
+        ImageAnimatorVisualizer((_stereo_tone(), 22050), output_file=io.BytesIO())
@@ -0,0 +1,95 @@
+"""Tests for overlapped rendering and encoding."""
+
+import subprocess
+import time
+import imageio_ffmpeg
+import numpy as np
+import pytest
+from sonicviz.visualization.pipeline import FramePipeline
+from sonicviz.visualization.waveform_visualizer import WaveformVisualizer
+
+
+def test_pipeline_consumes_frames_in_order():
+    """Test that every rendered frame reaches the consumer in order."""
+    consumed = []
+    FramePipeline(lambda i: i * 2, 50, consumed.append, queue_size=4).run()
+
+    assert consumed == [i * 2 for i in range(50)]
+
+
+def test_pipeline_bounds_frames_in_flight():
+    """Test that the renderer blocks once the queue is full."""
+    counts = {"rendered": 0, "consumed": 0, "peak": 0}
+
+    def render(frame_idx):
+        counts["rendered"] += 1
+        in_flight = counts["rendered"] - counts["consumed"]
+        counts["peak"] = max(counts["peak"], in_flight)
+        return frame_idx
+
+    def consume(frame_idx):
+        time.sleep(0.001)
+        counts["consumed"] += 1
+
+    FramePipeline(render, 100, consume, queue_size=3).run()
+    # queued frames + the one being consumed + the one being rendered
+    assert counts["peak"] <= 3 + 2
+
+
+def test_pipeline_reraises_consumer_errors():
+    """Test that an encoder failure stops rendering and is re-raised."""
+    rendered = []
+
+    def render(frame_idx):
+        rendered.append(frame_idx)
+        return frame_idx
+
+    def consume(frame_idx):
+        raise RuntimeError("encoder died")
+
+    with pytest.raises(RuntimeError, match="encoder died"):
+        FramePipeline(render, 1000, consume, queue_size=2).run()
+    assert len(rendered) < 1000
+
+
+def test_waveform_pipelined_run(temp_audio_file, temp_output_file):
+    """Test a pipelined waveform render without buffering frames."""
+    viz = WaveformVisualizer(temp_audio_file, temp_output_file, max_duration=0.3)
+    viz.run(pipelined=True)
+
+    assert viz.frames == []
+    frames, _ = imageio_ffmpeg.count_frames_and_secs(temp_output_file)
+    assert frames == len(viz.amplitude_history)
+    reader = imageio_ffmpeg.read_frames(temp_output_file)
+    meta = next(reader)
+    reader.close()
+    assert meta["audio_codec"] == "aac"
+
+
+def test_render_error_kills_encoder(temp_audio_file, tmp_path, monkeypatch):
+    """Test that a failing renderer kills ffmpeg and removes partial output."""
+    output_file = tmp_path / "out.mp4"
+    viz = WaveformVisualizer(temp_audio_file, str(output_file), max_duration=0.5)
+    processes = []
+    real_popen = subprocess.Popen
+
+    def recording_popen(*args, **kwargs):
+        process = real_popen(*args, **kwargs)
+        processes.append(process)
+        return process
+
+    def failing_render(frame_idx):
+        if frame_idx == 5:
+            raise RuntimeError("render failed")
+        return np.zeros((16, 16, 3), dtype=np.uint8)
+
+    monkeypatch.setattr(subprocess, "Popen", recording_popen)
+    monkeypatch.setattr(viz, "render_frame", failing_render)
+    viz.load_audio()
+    viz.compute_amplitude_history()
+
+    with pytest.raises(RuntimeError, match="render failed"):
+        viz.stream_video()
+    assert len(processes) == 1
+    assert processes[0].poll() is not None
+    assert not output_file.exists()
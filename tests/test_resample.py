@@ -0,0 +1,95 @@
+"""Tests for analysis-rate decimation."""
+
+import numpy as np
+import pytest
+import soundfile as sf
+from sonicviz.visualization import WaveformVisualizer
+from sonicviz.visualization.resample import (
+    array_blocks, decimate, decimation_factor, lowpass_taps
+)
+
+
+def _decimated(samples, factor, block_size=4096):
+    """Decimate an array through the block interface."""
+    return np.concatenate(list(decimate(array_blocks(samples, block_size), factor)))
+
+
+def test_decimation_factor():
+    """Test that the factor keeps the rate and divides window and hop."""
+    assert decimation_factor(96000, 48000, 2048, 512) == 2
+    assert decimation_factor(192000, 48000, 2048, 512) == 4
+    assert decimation_factor(96000, 44100, 2048, 512) == 2
+    assert decimation_factor(44100, 48000, 2048, 512) == 1
+    assert decimation_factor(96000, None, 2048, 512) == 1
+    # 3 does not divide the hop, so fall back to 2
+    assert decimation_factor(144000, 48000, 2048, 512) == 2
+
+
+def test_decimate_is_independent_of_block_size():
+    """Test that block-wise filtering matches filtering the whole signal."""
+    samples = np.random.default_rng(0).standard_normal(50001)
+    taps = lowpass_taps(4)
+    half = len(taps) // 2
+    padded = np.concatenate([np.zeros(half), samples, np.zeros(half)])
+    expected = np.convolve(padded, taps, mode="valid")[::4]
+
+    for block_size in (100, 4096, 60000):
+        result = _decimated(samples, 4, block_size)
+        assert len(result) == len(expected)
+        assert np.allclose(result, expected)
+
+
+def test_decimate_removes_aliases():
+    """Test that content above the new Nyquist frequency is filtered out."""
+    t = np.arange(96000) / 96000
+    above = _decimated(np.sin(2 * np.pi * 30000 * t), 2)
+    below = _decimated(np.sin(2 * np.pi * 1000 * t), 2)
+
+    assert np.std(above) < 0.01
+    assert np.std(below) > 0.7
+
+
+def test_analysis_rate_keeps_timing(tmp_path):
+    """Test that a decimated analysis has the same frames and a close envelope."""
+    sr = 96000
+    t = np.arange(3 * sr) / sr
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 0.7 * t)
+    samples = envelope * (np.sin(2 * np.pi * 220 * t) + 0.3 * np.sin(2 * np.pi * 3000 * t))
+    audio_file = tmp_path / "master.wav"
+    sf.write(str(audio_file), np.stack([samples, samples], axis=1) * 0.3, sr)
+
+    native = WaveformVisualizer(str(audio_file), str(tmp_path / "a.mp4"))
+    native.load_audio()
+    native.compute_amplitude_history()
+    decimated = WaveformVisualizer(
+        str(audio_file), str(tmp_path / "b.mp4"), analysis_rate=48000
+    )
+    decimated.load_audio()
+    decimated.compute_amplitude_history()
+
+    assert decimated.decimation == 2
+    assert len(decimated.y) == len(native.y) // 2
+    assert decimated.fps == native.fps
+    assert len(decimated.amplitude_history) == len(native.amplitude_history)
+    assert np.abs(decimated.amplitude_history - native.amplitude_history).max() < 0.02
+
+
+def test_in_memory_audio_is_muxed_untouched():
+    """Test that decimation leaves the samples used for muxing at full rate."""
+    sr = 96000
+    samples = 0.3 * np.sin(2 * np.pi * 440 * np.arange(sr) / sr)
+    viz = WaveformVisualizer((samples, sr), analysis_rate=48000)
+    viz.load_audio()
+    viz.compute_amplitude_history()
+
+    assert viz.source_audio is samples
+    assert viz.sr == sr
+    assert len(viz.y) == sr // 2
+    assert len(viz.amplitude_history) == WaveformVisualizer.count_frames(sr)
+
+
+@pytest.mark.parametrize("analysis_rate", [0, -1])
+def test_non_positive_analysis_rate_is_rejected(analysis_rate):
+    """Test that an analysis rate must be positive."""
+    with pytest.raises(ValueError, match="positive"):
+        WaveformVisualizer("song.wav", analysis_rate=analysis_rate)
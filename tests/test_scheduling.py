@@ -0,0 +1,196 @@
+"""Tests for job probing, longest-first ordering and segment splitting."""
+
+import time
+from pathlib import Path
+import imageio_ffmpeg
+import numpy as np
+import pytest
+import soundfile as sf
+from PIL import Image
+from sonicviz.processing import BatchProcessor
+from sonicviz.processing.scheduling import (
+    QUEUE_SIZES, WAVEFORM_PIXELS, Admission, ExecutionPlan, MemoryPlanner,
+    estimate_memory, longest_first, parse_memory_size, probe_job, split_job
+)
+from sonicviz.visualization.base import BaseVisualizer
+
+
+def _write_audio(path: Path, seconds: float, sr: int = 22050) -> None:
+    """Write a sine wave of the given length."""
+    t = np.linspace(0, seconds, int(sr * seconds), False)
+    sf.write(str(path), 0.3 * np.sin(2 * np.pi * 440 * t), sr)
+
+
+def test_probe_job_reads_headers(tmp_path):
+    """Test that probing reports duration, frames and image size."""
+    _write_audio(tmp_path / "a.wav", 2.0)
+    Image.new("RGBA", (40, 30)).save(tmp_path / "a.png")
+
+    job = probe_job(tmp_path / "a.wav", tmp_path / "a.png", tmp_path / "a.mp4")
+
+    assert job.duration == 2.0
+    assert job.sample_rate == 22050
+    assert job.channels == 1
+    assert job.frames == BaseVisualizer.count_frames(2 * 22050)
+    assert (job.width, job.height) == (40, 30)
+    assert job.cost == job.frames * 40 * 30
+
+
+def test_probe_job_respects_max_duration(tmp_path):
+    """Test that max_duration caps the probed length."""
+    _write_audio(tmp_path / "a.wav", 2.0)
+
+    job = probe_job(tmp_path / "a.wav", None, tmp_path / "a.mp4", max_duration=0.5)
+
+    assert job.duration == 0.5
+    assert job.frames == BaseVisualizer.count_frames(11025)
+    assert job.pixels == WAVEFORM_PIXELS
+
+
+def test_longest_first_orders_by_cost(tmp_path):
+    """Test that the most expensive job is dispatched first."""
+    for name, seconds in [("short", 0.2), ("long", 1.0), ("mid", 0.5)]:
+        _write_audio(tmp_path / f"{name}.wav", seconds)
+    jobs = [
+        probe_job(tmp_path / f"{name}.wav", None, tmp_path / f"{name}.mp4")
+        for name in ["short", "long", "mid"]
+    ]
+
+    ordered = longest_first(jobs)
+
+    assert [job.audio_file.stem for job in ordered] == ["long", "mid", "short"]
+
+
+def test_split_job_covers_every_frame(tmp_path):
+    """Test that segments are contiguous and cover the whole job."""
+    _write_audio(tmp_path / "a.wav", 1.0)
+    job = probe_job(tmp_path / "a.wav", None, tmp_path / "a.mp4")
+
+    segments = split_job(job, 10)
+
+    assert segments[0].frame_range[0] == 0
+    assert segments[-1].frame_range[1] == job.frames
+    for previous, current in zip(segments, segments[1:]):
+        assert previous.frame_range[1] == current.frame_range[0]
+    assert len({segment.output_file for segment in segments}) == len(segments)
+    assert split_job(job, job.frames) == [job]
+
+
+def test_parallel_folder_with_split_segments(tmp_path):
+    """Test that split segments are joined into one complete video with audio."""
+    input_folder = tmp_path / "in"
+    input_folder.mkdir()
+    _write_audio(input_folder / "long.wav", 1.0)
+    _write_audio(input_folder / "short.wav", 0.2)
+    for name in ["long", "short"]:
+        Image.new("RGBA", (32, 32), (200, 50, 50, 255)).save(input_folder / f"{name}.png")
+    output_folder = tmp_path / "out"
+
+    processor = BatchProcessor("image", jobs=2, split_seconds=0.3)
+    processor.process_folder(input_folder, output_folder)
+
+    expected = BaseVisualizer.count_frames(22050)
+    frames, _ = imageio_ffmpeg.count_frames_and_secs(str(output_folder / "long.mp4"))
+    assert frames == expected
+    reader = imageio_ffmpeg.read_frames(str(output_folder / "long.mp4"))
+    meta = next(reader)
+    reader.close()
+    assert meta["audio_codec"] == "aac"
+    assert sorted(path.name for path in output_folder.iterdir()) == ["long.mp4", "short.mp4"]
+
+
+def test_parse_memory_size():
+    """Test that sizes with binary units are parsed into bytes."""
+    assert parse_memory_size("512M") == 512 * 1024 ** 2
+    assert parse_memory_size("1.5G") == int(1.5 * 1024 ** 3)
+    assert parse_memory_size("2GiB") == 2 * 1024 ** 3
+    assert parse_memory_size("4096") == 4096
+    with pytest.raises(ValueError):
+        parse_memory_size("lots")
+
+
+def test_estimate_memory_buffered_grows_with_length(tmp_path):
+    """Test that buffering scales with the frame count and streaming does not."""
+    _write_audio(tmp_path / "short.wav", 0.5)
+    _write_audio(tmp_path / "long.wav", 2.0)
+    short = probe_job(tmp_path / "short.wav", None, tmp_path / "short.mp4")
+    long = probe_job(tmp_path / "long.wav", None, tmp_path / "long.mp4")
+
+    frame_bytes = WAVEFORM_PIXELS * 3
+    buffered_delta = estimate_memory(long, False) - estimate_memory(short, False)
+    streamed_delta = estimate_memory(long, True) - estimate_memory(short, True)
+    assert buffered_delta >= (long.frames - short.frames) * frame_bytes
+    # streaming only grows with the decoded audio
+    assert streamed_delta == (long.num_samples - short.num_samples) * 2 * 8
+
+
+def test_planner_degrades_to_streaming(tmp_path):
+    """Test that jobs are buffered, streamed, run alone or flagged by budget."""
+    _write_audio(tmp_path / "a.wav", 2.0)
+    job = probe_job(tmp_path / "a.wav", None, tmp_path / "a.mp4")
+    buffered = estimate_memory(job, False)
+    streamed = estimate_memory(job, True, QUEUE_SIZES[-1])
+
+    plan = MemoryPlanner(buffered * 2, jobs=2).plan(job)
+    assert not plan.pipelined and not plan.exclusive
+
+    plan = MemoryPlanner(buffered - 1).plan(job)
+    assert plan.pipelined and not plan.exclusive
+
+    plan = MemoryPlanner(streamed * 3 // 2, jobs=2).plan(job)
+    assert plan.pipelined and plan.exclusive and not plan.over_budget
+
+    plan = MemoryPlanner(streamed - 1).plan(job)
+    assert plan.over_budget and plan.queue_size == QUEUE_SIZES[-1]
+
+
+def test_memory_limit_serializes_jobs(tmp_path):
+    """Test that jobs which only fit the budget alone never overlap."""
+    input_folder = tmp_path / "in"
+    input_folder.mkdir()
+    for name in ["a", "b", "c"]:
+        _write_audio(input_folder / f"{name}.wav", 0.3)
+    output_folder = tmp_path / "out"
+    job = probe_job(input_folder / "a.wav", None, output_folder / "a.mp4")
+    limit = estimate_memory(job, True) * 3 // 2
+
+    processor = RecordingProcessor(jobs=3, memory_limit=limit)
+    processor.process_folder(input_folder, output_folder)
+
+    spans = sorted(
+        tuple(map(float, path.read_text().split()))
+        for path in output_folder.iterdir()
+    )
+    assert len(spans) == 3
+    for (_, end), (start, _) in zip(spans, spans[1:]):
+        assert end <= start
+
+
+class RecordingProcessor(BatchProcessor):
+    """Processor that records when each render ran instead of rendering."""
+
+    def render_file(self, audio_file, output_file, image_file=None,
+                    frame_range=None, pipelined=None, queue_size=32):
+        start = time.time()
+        time.sleep(0.2)
+        assert pipelined
+        Path(output_file).write_text(f"{start} {time.time()}")
+
+
+def test_admission_respects_slots_memory_and_exclusive_tasks():
+    """Test that tasks start only while slots and the memory limit allow."""
+    admission = Admission(slots=3, memory_limit=100)
+    small = ExecutionPlan(False, 32, 40)
+    exclusive = ExecutionPlan(True, 2, 150, exclusive=True, over_budget=True)
+
+    assert admission.admits(exclusive)
+    admission.start(small)
+    admission.start(small)
+    assert not admission.admits(small)
+    assert not admission.admits(exclusive)
+
+    admission.finish(small)
+    assert admission.admits(small)
+    admission.finish(small)
+    admission.start(exclusive)
+    assert not admission.admits(ExecutionPlan(False, 32, 1))
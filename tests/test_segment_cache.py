@@ -0,0 +1,96 @@
+"""Tests for the encoded-segment cache."""
+
+import os
+import imageio_ffmpeg
+import numpy as np
+import pytest
+import soundfile as sf
+from PIL import Image
+from sonicviz.visualization import ImageAnimatorVisualizer, SegmentCache
+from sonicviz.visualization.segment_cache import segment_key
+
+
+def test_segment_key_depends_on_params_and_curve():
+    """Test that keys change with the parameters or the curve slice only."""
+    curve = np.linspace(0, 1, 10)
+    key = segment_key({"scale": 1.2}, curve)
+
+    assert segment_key({"scale": 1.2}, curve.copy()) == key
+    assert segment_key({"scale": 1.3}, curve) != key
+    assert segment_key({"scale": 1.2}, curve[:9]) != key
+
+
+def test_cache_put_get_and_evict(tmp_path):
+    """Test that the least recently used segments are evicted first."""
+    cache = SegmentCache(tmp_path / "cache", max_bytes=250)
+    for index, key in enumerate(["a", "b", "c"]):
+        cache.put(key, ".mp4", lambda path: path.write_bytes(b"x" * 100))
+        os.utime(tmp_path / "cache" / f"{key}.mp4", ns=(index, index))
+
+    assert cache.get("missing", ".mp4") is None
+    assert cache.get("a", ".mp4") is not None  # refreshes "a"
+    assert cache.evict() == 1
+    assert sorted(path.name for path in (tmp_path / "cache").iterdir()) == ["a.mp4", "c.mp4"]
+
+
+def test_cache_put_leaves_nothing_on_failure(tmp_path):
+    """Test that a failed write leaves no partial segment behind."""
+    cache = SegmentCache(tmp_path)
+
+    def failing_write(path):
+        path.write_bytes(b"partial")
+        raise RuntimeError("encoder died")
+
+    with pytest.raises(RuntimeError):
+        cache.put("a", ".mp4", failing_write)
+    assert list(tmp_path.iterdir()) == []
+
+
+def _render(audio, image_file, output_file, cache, rendered):
+    """Render with the cache and return the rendered frame indices."""
+    rendered.clear()
+    viz = ImageAnimatorVisualizer(str(audio), str(image_file), str(output_file))
+    viz.run(cache=cache)
+    return viz, list(rendered)
+
+
+def test_rerender_only_changed_segments(tmp_path, monkeypatch):
+    """Test that editing the end of a track only re-renders the last segments."""
+    monkeypatch.setattr(ImageAnimatorVisualizer, "SEGMENT_SECONDS", 1)
+    rendered = []
+    render_frame = ImageAnimatorVisualizer.render_frame
+
+    def recording_render(self, frame_idx):
+        rendered.append(frame_idx)
+        return render_frame(self, frame_idx)
+
+    monkeypatch.setattr(ImageAnimatorVisualizer, "render_frame", recording_render)
+    sr = 22050
+    t = np.arange(4 * sr) / sr
+    samples = 0.5 * np.sin(2 * np.pi * 440 * t)
+    samples[3 * sr:] *= 0.2
+    audio = tmp_path / "song.wav"
+    sf.write(str(audio), samples, sr)
+    image_file = tmp_path / "song.png"
+    Image.new("RGBA", (32, 32), (200, 50, 50, 255)).save(image_file)
+    output_file = tmp_path / "song.mp4"
+    cache = SegmentCache(tmp_path / "cache")
+
+    viz, frames = _render(audio, image_file, output_file, cache, rendered)
+    assert frames == list(range(len(viz.motion_curve)))
+
+    _, frames = _render(audio, image_file, output_file, cache, rendered)
+    assert frames == []
+
+    samples[3 * sr:] *= 2
+    sf.write(str(audio), samples, sr)
+    _, frames = _render(audio, image_file, output_file, cache, rendered)
+    assert 0 < len(frames) < len(viz.motion_curve) // 2
+    assert min(frames) >= 2 * 43
+
+    frame_count, _ = imageio_ffmpeg.count_frames_and_secs(str(output_file))
+    assert frame_count == len(viz.motion_curve)
+    reader = imageio_ffmpeg.read_frames(str(output_file))
+    meta = next(reader)
+    reader.close()
+    assert meta["audio_codec"] == "aac"
@@ -0,0 +1,60 @@
+"""Tests for the warm render server."""
+
+import os
+import pytest
+from PIL import Image
+from sonicviz.processing import RenderClient, RenderServer
+from sonicviz.visualization.image_animator import load_image
+
+
+@pytest.fixture
+def server():
+    """Run a one-worker server on a free port."""
+    server = RenderServer(port=0, workers=1)
+    server.start()
+    yield server
+    server.shutdown()
+
+
+def test_health(server):
+    """Test the health endpoint."""
+    assert RenderClient(server.url).health() == {"status": "ok", "workers": 1}
+
+
+def test_render_job(server, temp_audio_file, tmp_path):
+    """Test rendering a file through the server."""
+    output_file = tmp_path / "out" / "song.mp4"
+    reply = RenderClient(server.url).render(
+        temp_audio_file, output_file, type="waveform", max_duration=0.2
+    )
+
+    assert reply["status"] == "ok"
+    assert reply["seconds"] > 0
+    assert output_file.stat().st_size > 0
+
+
+def test_bad_requests(server, temp_audio_file, tmp_path):
+    """Test that invalid jobs and render failures are reported."""
+    client = RenderClient(server.url)
+    with pytest.raises(RuntimeError, match="required"):
+        client._request("/render", {"input": temp_audio_file})
+    with pytest.raises(RuntimeError, match="Unknown visualizer type"):
+        client.render(temp_audio_file, tmp_path / "out.mp4", type="spectrum")
+    with pytest.raises(RuntimeError):
+        client.render(tmp_path / "missing.wav", tmp_path / "out.mp4")
+
+
+def test_image_cache_follows_mtime(tmp_path):
+    """Test that decoded images are reused until the file changes."""
+    path = tmp_path / "cover.png"
+    Image.new("RGB", (10, 10), (255, 0, 0)).save(path)
+
+    first = load_image(str(path))
+    assert load_image(str(path)) is first
+
+    Image.new("RGB", (12, 10), (0, 255, 0)).save(path)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    second = load_image(str(path))
+    assert second is not first
+    assert second.size == (12, 10)
@@ -0,0 +1,121 @@
+"""Tests for the watch-folder daemon."""
+
+import heapq
+import numpy as np
+import soundfile as sf
+from PIL import Image
+from sonicviz.processing import BatchProcessor, FolderWatcher
+
+
+def _write_audio(path, seconds, sr=8000):
+    """Write a short sine wave."""
+    t = np.arange(int(seconds * sr)) / sr
+    sf.write(str(path), 0.3 * np.sin(2 * np.pi * 220 * t), sr)
+
+
+def _watcher(tmp_path, visualizer_type="waveform", **kwargs):
+    """Create a watcher on an empty input folder."""
+    input_folder = tmp_path / "uploads"
+    input_folder.mkdir()
+    processor = BatchProcessor(visualizer_type, **kwargs)
+    return FolderWatcher(processor, input_folder, tmp_path / "videos", interval=0.01)
+
+
+def test_files_are_queued_once_settled(tmp_path):
+    """Test that a file is queued after one unchanged poll, and only once."""
+    watcher = _watcher(tmp_path)
+    _write_audio(watcher.input_folder / "song.wav", 1)
+
+    assert watcher.poll() == []
+    queued = watcher.poll()
+    assert [job.audio_file.name for job in queued] == ["song.wav"]
+    assert watcher.poll() == []
+
+
+def test_growing_files_are_debounced(tmp_path):
+    """Test that a file still being written is not queued."""
+    watcher = _watcher(tmp_path)
+    audio_file = watcher.input_folder / "song.wav"
+    _write_audio(audio_file, 1)
+    watcher.poll()
+
+    _write_audio(audio_file, 2)
+    assert watcher.poll() == []
+    assert len(watcher.poll()) == 1
+
+
+def test_queued_files_are_not_queued_again(tmp_path):
+    """Test that relisting a directory does not queue a file twice."""
+    watcher = _watcher(tmp_path)
+    audio_file = watcher.input_folder / "a.wav"
+    _write_audio(audio_file, 1)
+    watcher.poll()
+    _write_audio(audio_file, 2)
+    while not watcher.poll():
+        pass
+
+    _write_audio(watcher.input_folder / "b.wav", 1)
+    watcher.poll()
+    watcher.poll()
+    assert sorted(job.audio_file.name for _, _, job in watcher.ready) == ["a.wav", "b.wav"]
+
+    # Once rendered, only a change queues the file again
+    for _, _, job in watcher.ready:
+        watcher.finished(job.audio_file)
+    watcher.ready = []
+    _write_audio(watcher.input_folder / "c.wav", 1)
+    watcher.poll()
+    assert [job.audio_file.name for job in watcher.poll()] == ["c.wav"]
+
+
+def test_image_jobs_wait_for_png(tmp_path, capsys):
+    """Test that image jobs are held back until the paired PNG is complete."""
+    watcher = _watcher(tmp_path, "image")
+    _write_audio(watcher.input_folder / "song.wav", 1)
+
+    assert watcher.poll() == []
+    assert watcher.poll() == []
+    assert "Waiting for song.png" in capsys.readouterr().out
+
+    Image.new("RGB", (40, 30)).save(watcher.input_folder / "song.png")
+    assert watcher.poll() == []
+    queued = watcher.poll()
+    assert queued[0].image_file == watcher.input_folder / "song.png"
+    assert (queued[0].width, queued[0].height) == (40, 30)
+
+
+def test_up_to_date_outputs_are_skipped(tmp_path):
+    """Test that files already rendered before a restart are not queued."""
+    watcher = _watcher(tmp_path)
+    _write_audio(watcher.input_folder / "song.wav", 1)
+    watcher.output_folder.mkdir()
+    (watcher.output_folder / "song.mp4").write_bytes(b"x")
+
+    watcher.poll()
+    assert watcher.poll() == []
+    assert watcher.ready == []
+
+
+def test_shortest_files_render_first(tmp_path):
+    """Test that ready jobs come out of the queue shortest first."""
+    watcher = _watcher(tmp_path)
+    for name, seconds in [("long.wav", 3), ("short.wav", 0.5), ("mid.wav", 1)]:
+        _write_audio(watcher.input_folder / name, seconds)
+    watcher.poll()
+    watcher.poll()
+
+    order = [heapq.heappop(watcher.ready)[2].audio_file.name for _ in range(3)]
+    assert order == ["short.wav", "mid.wav", "long.wav"]
+
+
+def test_run_once_renders_and_persists_index(tmp_path):
+    """Test that a single pass renders every complete file and saves the index."""
+    index_file = tmp_path / "index.json"
+    watcher = _watcher(tmp_path, max_duration=0.3, index_file=str(index_file))
+    _write_audio(watcher.input_folder / "a.wav", 1)
+    _write_audio(watcher.input_folder / "b.wav", 1)
+
+    watcher.run(once=True)
+
+    assert sorted(path.name for path in watcher.output_folder.iterdir()) == ["a.mp4", "b.mp4"]
+    assert index_file.exists()
@@ -60,3 +60,18 @@ def test_waveform_frame_dimensions(temp_audio_file, temp_output_file):
 
     # All frames should have same dimensions
     assert frame1.shape == frame2.shape
+
+
+def test_render_frame_is_gray(temp_audio_file, temp_output_file):
+    """Test that rendered frames are one channel matching the RGB frame."""
+    viz = WaveformVisualizer(temp_audio_file, temp_output_file, max_duration=0.5)
+    viz.load_audio()
+    viz.compute_amplitude_history()
+
+    frame = viz.render_frame(3)
+    rgb = viz.generate_frame(viz.motion_curve[3])
+
+    assert viz.PIXEL_FORMAT == "gray"
+    assert frame.shape == (viz.HEIGHT, viz.WIDTH)
+    assert np.array_equal(frame, rgb[:, :, 0])
+    assert np.array_equal(rgb[:, :, 0], rgb[:, :, 2])